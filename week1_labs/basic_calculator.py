@@ -1,44 +1,168 @@
 # basic_calculator.py
 # CCCS 106 - Week 1 Lab Exercise
 # Simple Interactive Calculator
+#
+# Run it with no arguments for the interactive calculator. For many pairs at
+# once, use batch mode (needs NumPy):
+#     python basic_calculator.py --batch pairs.csv --output results.csv
+#     some_command | python basic_calculator.py --batch -
+# Each input line holds two numbers separated by a comma or whitespace.
 
-print("=" * 40)
-print("BASIC CALCULATOR")
-print("=" * 40)
-
-# Get user input
-print("Enter two numbers for calculation:")
-try:
-    num1 = float(input("First number: "))
-    num2 = float(input("Second number: "))
-    
-    # Perform calculations
-    addition = num1 + num2
-    subtraction = num1 - num2
-    multiplication = num1 * num2
-    
-    # Handle division by zero
-    if num2 != 0:
-        division = num1 / num2
-    else:
-        division = "Cannot divide by zero"
-    
-    # Display results
-    print("\n" + "=" * 40)
-    print("RESULTS:")
+import argparse
+import sys
+import time
+from itertools import islice
+
+CHUNK_SIZE = 100_000      # lines read, computed and written at a time
+BATCH_FORMAT = "%.15g"
+BATCH_HEADER = "num1,num2,sum,difference,product,quotient"
+
+
+def interactive():
     print("=" * 40)
-    print(f"{num1} + {num2} = {addition}")
-    print(f"{num1} - {num2} = {subtraction}")
-    print(f"{num1} * {num2} = {multiplication}")
-    print(f"{num1} / {num2} = {division}")
+    print("BASIC CALCULATOR")
+    print("=" * 40)
+    
+    # Get user input
+    print("Enter two numbers for calculation:")
+    try:
+        num1 = float(input("First number: "))
+        num2 = float(input("Second number: "))
+        
+        # Perform calculations
+        addition = num1 + num2
+        subtraction = num1 - num2
+        multiplication = num1 * num2
+        
+        # Handle division by zero
+        if num2 != 0:
+            division = num1 / num2
+        else:
+            division = "Cannot divide by zero"
+        
+        # Display results
+        print("\n" + "=" * 40)
+        print("RESULTS:")
+        print("=" * 40)
+        print(f"{num1} + {num2} = {addition}")
+        print(f"{num1} - {num2} = {subtraction}")
+        print(f"{num1} * {num2} = {multiplication}")
+        print(f"{num1} / {num2} = {division}")
+        
+        # Additional information
+        print(f"\nLarger number: {max(num1, num2)}")
+        print(f"Smaller number: {min(num1, num2)}")
     
-    # Additional information
-    print(f"\nLarger number: {max(num1, num2)}")
-    print(f"Smaller number: {min(num1, num2)}")
+    except ValueError:
+        print("Error: Please enter valid numbers only!")
+    except Exception as e:
+        print(f"An error occurred: {e}")
     
-except ValueError:
-    print("Error: Please enter valid numbers only!")
-except Exception as e:
-    print(f"An error occurred: {e}")
+    print("\nThank you for using Basic Calculator!")
+
+
+def parse_chunk(np, lines, first_line_number):
+    """Turns text lines into an (n, 2) array, skipping blank and unreadable lines.
+    
+    Returns the array and the number of lines skipped as unreadable.
+    """
+    lines = [line.replace(",", " ") for line in lines]
+    if not any(line.strip() for line in lines):
+        # All blank; loadtxt would warn about the empty input
+        return np.empty((0, 2), dtype=np.float64), 0
+    try:
+        # Fast path: the whole chunk parsed in C. comments=None, so a "#" line is
+        # not dropped silently but sent to the fallback and reported like any bad line
+        pairs = np.loadtxt(lines, dtype=np.float64, ndmin=2, comments=None)
+        if pairs.size == 0 or pairs.shape[1] == 2:
+            return pairs.reshape(-1, 2), 0
+    except ValueError:
+        pass
+    # Some line is malformed (or is a header); find it line by line
+    rows = []
+    skipped = 0
+    for number, line in enumerate(lines, first_line_number):
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            if len(fields) != 2:
+                raise ValueError
+            rows.append((float(fields[0]), float(fields[1])))
+        except ValueError:
+            print(f"Skipping line {number}: {line.strip()!r}", file=sys.stderr)
+            skipped += 1
+    return np.array(rows, dtype=np.float64).reshape(-1, 2), skipped
+
+
+def calculate_chunk(np, pairs):
+    """Sum, difference, product and quotient for each pair; the quotient is NaN where num2 is 0."""
+    num1 = pairs[:, 0]
+    num2 = pairs[:, 1]
+    quotient = np.full_like(num1, np.nan)
+    # Handle division by zero per element
+    np.divide(num1, num2, out=quotient, where=num2 != 0)
+    return np.column_stack((num1, num2, num1 + num2, num1 - num2, num1 * num2, quotient))
+
+
+def run_batch(source, output, chunk_size=CHUNK_SIZE):
+    """Streams pairs from source to CSV results on output, chunk_size lines at a time."""
+    try:
+        import numpy as np
+    except ImportError:
+        print("Error: batch mode needs NumPy (pip install numpy)", file=sys.stderr)
+        return 1
+    
+    started = time.perf_counter()
+    rows = skipped = zero_divisions = 0
+    line_number = 1
+    output.write(BATCH_HEADER + "\n")
+    while True:
+        lines = list(islice(source, chunk_size))
+        if not lines:
+            break
+        pairs, bad = parse_chunk(np, lines, line_number)
+        line_number += len(lines)
+        skipped += bad
+        if not len(pairs):
+            continue
+        
+        results = calculate_chunk(np, pairs)
+        # One % over the whole chunk formats far faster than a row at a time (np.savetxt)
+        row_format = ",".join([BATCH_FORMAT] * results.shape[1]) + "\n"
+        text = (row_format * len(results)) % tuple(results.ravel().tolist())
+        # An empty quotient field marks "Cannot divide by zero"
+        output.write(text.replace(",nan\n", ",\n"))
+        rows += len(pairs)
+        zero_divisions += int(np.count_nonzero(pairs[:, 1] == 0))
+    
+    elapsed = time.perf_counter() - started
+    print(f"Calculated {rows} pairs in {elapsed:.2f}s ({zero_divisions} divisions by zero, "
+          f"{skipped} lines skipped)", file=sys.stderr)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Basic calculator: interactive, or batch over a file of number pairs.")
+    parser.add_argument("--batch", metavar="FILE", help="read number pairs from FILE ('-' for stdin)")
+    parser.add_argument("--output", metavar="FILE", help="write batch results to FILE instead of stdout")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    
+    if args.batch is None:
+        interactive()
+        return 0
+    
+    source = sys.stdin if args.batch == "-" else open(args.batch)
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        return run_batch(source, output, args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
 
-print("\nThank you for using Basic Calculator!")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# bench_calc_modes.py
+# CCCS 106 - Week 2 Lab Exercise
+# Speed and accuracy of the calculator engine's number modes
+#
+# Usage:
+#     python bench_calc_modes.py
+#     python bench_calc_modes.py --evaluations 200000 --output modes.json
+#
+# Each workload formula is compiled once per mode and then evaluated with the
+# same seeded random inputs, so the numbers show only the cost of the number
+# type. The accuracy check adds 0.01 to a running total many times, the way
+# money piles up, and reports how far each mode drifts from the exact sum.
+
+import argparse
+import json
+import platform
+import random
+import time
+from fractions import Fraction
+
+from calc_engine import DEFAULT_PRECISION, compile_formula
+
+DEFAULT_EVALUATIONS = 100_000
+DEFAULT_SEED = 106
+ACCUMULATIONS = 100_000
+
+# (workload name, formula, variable names)
+WORKLOADS = [
+    ("invoice", "price * qty * (1 + tax) - discount", ("price", "qty", "tax", "discount")),
+    ("polynomial", "3*x^2 + 2*x - y / 4", ("x", "y")),
+    ("ratio", "(a + b) / (a - b) + a % 7", ("a", "b")),
+]
+
+# (label, mode, precision)
+MODES = [
+    ("float", "float", None),
+    ("decimal-28", "decimal", 28),
+    ("decimal-50", "decimal", 50),
+    ("fraction", "fraction", None),
+]
+
+
+def make_inputs(rng, names, count):
+    # Two decimal places, like money; b is kept away from a so ratio never divides by zero
+    rows = []
+    for _ in range(count):
+        row = {name: round(rng.uniform(1, 1000), 2) for name in names}
+        if "b" in row:
+            row["b"] = row["a"] + round(rng.uniform(1, 100), 2)
+        rows.append(row)
+    return rows
+
+
+def bench_workload(formula_text, inputs, mode, precision):
+    formula = compile_formula(formula_text, mode, precision or DEFAULT_PRECISION)
+    started = time.perf_counter()
+    for variables in inputs:
+        formula.evaluate(variables)
+    elapsed = time.perf_counter() - started
+    return {"evaluations_per_sec": len(inputs) / elapsed, "us_per_evaluation": elapsed / len(inputs) * 1e6}
+
+
+def accumulation_error(mode, precision, count=ACCUMULATIONS):
+    """How far adding 0.01 count times lands from the exact total."""
+    formula = compile_formula("total + amount", mode, precision or DEFAULT_PRECISION)
+    # 0.01 as a literal, so each mode reads it its own way (float rounds it to binary)
+    amount = compile_formula("0.01", mode, precision or DEFAULT_PRECISION).evaluate()
+    total = 0
+    for _ in range(count):
+        total = formula.evaluate(total=total, amount=amount)
+    return abs(Fraction(str(total)) - Fraction(count, 100))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the calculator engine's number modes.")
+    parser.add_argument("--evaluations", type=int, default=DEFAULT_EVALUATIONS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "evaluations": args.evaluations,
+            "seed": args.seed,
+        },
+        "speed": {},
+        "accumulation_error": {},
+    }
+    
+    print(f"{'workload':<12}" + "".join(f"{label:>14}" for label, _, _ in MODES) + "   (evaluations/s)")
+    for name, formula_text, variables in WORKLOADS:
+        inputs = make_inputs(random.Random(args.seed), variables, args.evaluations)
+        results = {label: bench_workload(formula_text, inputs, mode, precision) for label, mode, precision in MODES}
+        report["speed"][name] = results
+        print(f"{name:<12}" + "".join(f"{results[label]['evaluations_per_sec']:>14,.0f}" for label, _, _ in MODES))
+    
+    print(f"\nError after adding 0.01 {ACCUMULATIONS:,} times:")
+    for label, mode, precision in MODES:
+        error = accumulation_error(mode, precision)
+        report["accumulation_error"][label] = float(error)
+        print(f"  {label:<12} {float(error):.3e}")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+# calc_engine.py
+# CCCS 106 - Week 2 Lab Exercise
+# Expression engine for the enhanced calculator
+#
+# A formula is tokenized, parsed by precedence climbing, and compiled once
+# into a tree of Python closures. Compiled formulas are cached by their text,
+# so evaluating the same formula again with new variable values skips
+# tokenizing and parsing entirely. Nothing is passed to eval(), so only the
+# operators and functions listed here can run.
+#
+# Numbers are floats by default, the fast path. A formula can instead be
+# compiled in "decimal" mode (decimal.Decimal at a chosen precision, so
+# 0.1 + 0.2 is exactly 0.3) or "fraction" mode (exact fractions.Fraction
+# arithmetic, so 1/3 stays 1/3). Both exact modes cost speed; see
+# bench_calc_modes.py for the trade-off.
+
+import math
+import operator
+import re
+from collections.abc import Mapping
+from decimal import Context, Decimal, InvalidOperation, Overflow, localcontext
+from fractions import Fraction
+from functools import lru_cache
+
+CACHE_SIZE = 256   # compiled formulas kept, least recently used dropped first
+MODES = ("float", "decimal", "fraction")
+DEFAULT_PRECISION = 28       # significant digits in decimal mode
+MAX_PRECISION = 1000         # decimal mode: every operation slows down as digits grow
+MODE_CACHE_SIZE = 16         # number modes kept; decimal ones differ by precision
+MAX_EXACT_DIGITS = 4000      # fraction mode: longest numerator or denominator; more is slow and cannot be printed
+MAX_EXACT_BITS = math.ceil(MAX_EXACT_DIGITS / math.log10(2))
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+      | (?P<op>\*\*|//|[-+*/%^(),])
+    )""", re.VERBOSE)
+
+# Binary operators: symbol -> (precedence, right associative, function)
+BINARY_OPERATORS = {
+    "+": (1, False, operator.add),
+    "-": (1, False, operator.sub),
+    "*": (2, False, operator.mul),
+    "/": (2, False, operator.truediv),
+    "//": (2, False, operator.floordiv),
+    "%": (2, False, operator.mod),
+    "^": (4, True, operator.pow),
+    "**": (4, True, operator.pow),
+}
+UNARY_PRECEDENCE = 3   # between * and ^, so -2^2 is -(2^2)
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+}
+
+# name -> (function, fewest arguments, most arguments or None for any number)
+FUNCTIONS = {
+    "sqrt": (math.sqrt, 1, 1),
+    "abs": (abs, 1, 1),
+    "sin": (math.sin, 1, 1),
+    "cos": (math.cos, 1, 1),
+    "tan": (math.tan, 1, 1),
+    "asin": (math.asin, 1, 1),
+    "acos": (math.acos, 1, 1),
+    "atan": (math.atan, 1, 1),
+    "exp": (math.exp, 1, 1),
+    "ln": (math.log, 1, 1),
+    "log": (math.log, 1, 2),         # log(x) is natural, log(x, base)
+    "log10": (math.log10, 1, 1),
+    "floor": (math.floor, 1, 1),
+    "ceil": (math.ceil, 1, 1),
+    "round": (lambda x, digits=0: round(x, int(digits)), 1, 2),
+    # Through *args, so min(3) is 3 rather than "not iterable"
+    "min": (lambda *args: min(args), 1, None),
+    "max": (lambda *args: max(args), 1, None),
+    "hypot": (math.hypot, 1, None),
+    "radians": (math.radians, 1, 1),
+    "degrees": (math.degrees, 1, 1),
+}
+
+# Functions that stay exact on fractions; the rest (sqrt, sin, ...) have irrational results
+FRACTION_FUNCTIONS = {name: FUNCTIONS[name] for name in ("abs", "floor", "ceil", "round", "min", "max")}
+
+
+class CalcError(Exception):
+    """Raised for a formula that cannot be parsed or evaluated; position is the offending column, if known."""
+    
+    def __init__(self, message, position=None):
+        super().__init__(message)
+        self.position = position
+
+
+def tokenize(text):
+    """Splits text into (kind, value, position) tuples, ending with an ("end", None, len) token."""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            column = len(text) - len(text[position:].lstrip())
+            raise CalcError(f"Unexpected character {text[column]!r}", column)
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+    tokens.append(("end", None, len(text)))
+    return tokens
+
+
+class _Parser:
+    """Precedence-climbing parser from tokens to a tuple-based syntax tree.
+    
+    Nodes are ("num", literal text), ("var", name), ("neg", operand),
+    ("binary", symbol, left, right) and ("call", name, arguments, position).
+    """
+    
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+    
+    def peek(self):
+        return self.tokens[self.index]
+    
+    def take(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+    
+    def expect(self, value):
+        kind, found, position = self.take()
+        if found != value:
+            raise CalcError(f"Expected {value!r}" + (f" but found {found!r}" if found else " at the end"), position)
+    
+    def parse(self):
+        node = self.expression(0)
+        kind, value, position = self.peek()
+        if kind != "end":
+            raise CalcError(f"Unexpected {value!r}", position)
+        return node
+    
+    def expression(self, min_precedence):
+        left = self.unary()
+        while True:
+            kind, value, _ = self.peek()
+            if kind != "op" or value not in BINARY_OPERATORS:
+                return left
+            precedence, right_associative, _ = BINARY_OPERATORS[value]
+            if precedence < min_precedence:
+                return left
+            self.take()
+            right = self.expression(precedence if right_associative else precedence + 1)
+            left = ("binary", value, left, right)
+    
+    def unary(self):
+        kind, value, _ = self.peek()
+        if kind == "op" and value in ("-", "+"):
+            self.take()
+            operand = self.expression(UNARY_PRECEDENCE)
+            return ("neg", operand) if value == "-" else operand
+        return self.primary()
+    
+    def primary(self):
+        kind, value, position = self.take()
+        if kind == "number":
+            # Kept as text: each number mode converts it without going through float
+            return ("num", value)
+        if kind == "name":
+            if self.peek()[1] == "(":
+                self.take()
+                arguments = []
+                if self.peek()[1] != ")":
+                    arguments.append(self.expression(0))
+                    while self.peek()[1] == ",":
+                        self.take()
+                        arguments.append(self.expression(0))
+                self.expect(")")
+                return ("call", value, arguments, position)
+            return ("var", value)
+        if value == "(":
+            node = self.expression(0)
+            self.expect(")")
+            return node
+        if kind == "end":
+            raise CalcError("Formula ends too early", position)
+        raise CalcError(f"Unexpected {value!r}", position)
+
+
+def parse(text):
+    """Parses text into a syntax tree (see _Parser)."""
+    return _Parser(tokenize(text)).parse()
+
+
+def _decimal_pi(precision):
+    """pi to precision digits (the recipe from the decimal module's documentation)."""
+    with localcontext() as ctx:
+        ctx.prec = precision + 2
+        lasts, t, total, n, na, d, da = 0, Decimal(3), 3, 1, 0, 0, 24
+        while total != lasts:
+            lasts = total
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            total += t
+    with localcontext() as ctx:
+        ctx.prec = precision
+        return +total
+
+
+def _in_float(function):
+    # No Decimal version in the standard library, so computed at float precision
+    return lambda *args: Decimal(repr(function(*map(float, args))))
+
+
+def _decimal_functions(pi):
+    # pi is a function, so the series behind it is only summed once radians() or degrees() runs
+    functions = {name: (_in_float(function), fewest, most) for name, (function, fewest, most) in FUNCTIONS.items()}
+    functions.update({
+        "sqrt": (Decimal.sqrt, 1, 1),
+        "abs": (abs, 1, 1),
+        "exp": (Decimal.exp, 1, 1),
+        "ln": (Decimal.ln, 1, 1),
+        "log": (lambda x, base=None: x.ln() if base is None else x.ln() / base.ln(), 1, 2),
+        "log10": (Decimal.log10, 1, 1),
+        "floor": (lambda x: Decimal(math.floor(x)), 1, 1),
+        "ceil": (lambda x: Decimal(math.ceil(x)), 1, 1),
+        "round": (lambda x, digits=0: round(x, int(digits)), 1, 2),
+        "min": FUNCTIONS["min"],
+        "max": FUNCTIONS["max"],
+        "hypot": (lambda *args: sum(arg * arg for arg in args).sqrt(), 1, None),
+        "radians": (lambda x: x * pi() / 180, 1, 1),
+        "degrees": (lambda x: x * 180 / pi(), 1, 1),
+    })
+    return functions
+
+
+def _check_exact_size(value):
+    """value, unless its numerator or denominator is longer than MAX_EXACT_DIGITS."""
+    if max(value.numerator.bit_length(), value.denominator.bit_length()) > MAX_EXACT_BITS:
+        raise CalcError(f"Result has more than {MAX_EXACT_DIGITS} digits, too many for fraction mode")
+    return value
+
+
+def _decimal_floordiv(a, b):
+    # Decimal's // truncates toward zero; float and Fraction floor, so -7 // 2 is -4 in every mode
+    if not b:
+        # Decimal reports 0 // 0 and x % 0 as invalid rather than as division by zero
+        raise ZeroDivisionError
+    quotient = a // b
+    if (a % b) and (a < 0) != (b < 0):
+        quotient -= 1
+    return quotient
+
+
+def _decimal_mod(a, b):
+    # Decimal's % takes the sign of a; float and Fraction give it the sign of b, so -7 % 2 is 1
+    if not b:
+        raise ZeroDivisionError
+    remainder = a % b
+    if remainder and (remainder < 0) != (b < 0):
+        remainder += b
+    return remainder
+
+
+def _exact_power(base, exponent):
+    if exponent.denominator != 1:
+        raise CalcError("Fraction mode can only raise to whole-number powers")
+    # A part of bit_length b is at least 2^(b - 1), so this refuses oversized results before computing them
+    bits = max(base.numerator.bit_length(), base.denominator.bit_length())
+    if (bits - 1) * abs(exponent) > MAX_EXACT_BITS:
+        raise CalcError(f"Result has more than {MAX_EXACT_DIGITS} digits, too many for fraction mode")
+    return _check_exact_size(base ** exponent)
+
+
+def _to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    try:
+        # Through str, so the float 0.1 becomes Decimal("0.1") rather than its binary expansion
+        return Decimal(value) if isinstance(value, int) else Decimal(str(value).strip())
+    except InvalidOperation:
+        raise CalcError(f"{value!r} is not a number") from None
+
+
+def _to_fraction(value):
+    if isinstance(value, (int, Fraction)):
+        return Fraction(value)
+    text = str(value).strip()
+    try:
+        # 1e100000000 is refused from its exponent, before Fraction spends minutes building it
+        _, _, exponent = text.lower().partition("e")
+        if exponent and abs(int(exponent)) > MAX_EXACT_DIGITS:
+            raise CalcError(f"{text} has more than {MAX_EXACT_DIGITS} digits, too many for fraction mode")
+        return Fraction(text)
+    except ValueError:
+        raise CalcError(f"{value!r} is not a number") from None
+
+
+class _LazyConstants(Mapping):
+    """Constants computed under context the first time a formula uses them, then kept."""
+    
+    def __init__(self, factories, context):
+        self._factories = factories   # name -> function of no arguments
+        self._context = context
+        self._values = {}
+    
+    def __getitem__(self, name):
+        if name not in self._values:
+            factory = self._factories[name]
+            with localcontext(self._context):
+                self._values[name] = factory()
+        return self._values[name]
+    
+    def __contains__(self, name):
+        # Without this, Mapping would compute the value just to answer "in"
+        return name in self._factories
+    
+    def __iter__(self):
+        return iter(self._factories)
+    
+    def __len__(self):
+        return len(self._factories)
+
+
+class NumberMode:
+    """What numbers are in a compiled formula: the literal and variable conversions, constants and functions."""
+    
+    __slots__ = ("name", "number", "convert", "constants", "functions", "operators", "context")
+    
+    def __init__(self, name, number, convert, constants, functions, operators, context=None):
+        self.name = name
+        self.number = number          # literal text -> number
+        self.convert = convert        # variable value -> number; None to pass values through untouched
+        self.constants = constants
+        self.functions = functions
+        self.operators = operators    # symbol -> function
+        self.context = context        # decimal context to evaluate under, if any
+
+
+@lru_cache(maxsize=MODE_CACHE_SIZE)
+def number_mode(name="float", precision=DEFAULT_PRECISION):
+    """The NumberMode called name ("float", "decimal" or "fraction"); precision only matters for decimal.
+    
+    Decimal precision is capped at MAX_PRECISION digits, and pi is only
+    computed for formulas that use pi, tau, radians() or degrees().
+    """
+    operators = {symbol: function for symbol, (_, _, function) in BINARY_OPERATORS.items()}
+    if name == "float":
+        return NumberMode(name, float, None, CONSTANTS, FUNCTIONS, operators)
+    if name == "decimal":
+        if not isinstance(precision, int) or not 1 <= precision <= MAX_PRECISION:
+            raise CalcError(f"Precision must be a whole number of digits from 1 to {MAX_PRECISION}")
+        context = Context(prec=precision)
+        constants = _LazyConstants({
+            "pi": lambda: _decimal_pi(precision),
+            "e": lambda: Decimal(1).exp(),
+            "tau": lambda: 2 * constants["pi"],
+        }, context)
+        pi = lambda: constants["pi"]
+        operators["//"] = _decimal_floordiv
+        operators["%"] = _decimal_mod
+        return NumberMode(name, Decimal, _to_decimal, constants, _decimal_functions(pi), operators, context)
+    if name == "fraction":
+        operators["^"] = operators["**"] = _exact_power
+        return NumberMode(name, _to_fraction, _to_fraction, {}, FRACTION_FUNCTIONS, operators)
+    raise CalcError(f"Unknown number mode {name!r}; choose from {', '.join(MODES)}")
+
+
+def _constant(value):
+    # Marked so the compiler can fold operations on constants
+    evaluate = lambda variables: value
+    evaluate.constant = value
+    return evaluate
+
+
+def _compile(node, names, mode):
+    """Turns a syntax tree into a function of the variables dict, collecting variable names into names."""
+    kind = node[0]
+    if kind == "num":
+        return _constant(mode.number(node[1]))
+    
+    if kind == "var":
+        name = node[1]
+        if name in mode.constants:
+            return _constant(mode.constants[name])
+        if name in CONSTANTS:
+            raise CalcError(f"{name} is irrational, so it is not available in {mode.name} mode")
+        names.add(name)
+        return lambda variables: variables[name]
+    
+    if kind == "neg":
+        operand = _compile(node[1], names, mode)
+        if hasattr(operand, "constant"):
+            return _constant(-operand.constant)
+        return lambda variables: -operand(variables)
+    
+    if kind == "binary":
+        function = mode.operators[node[1]]
+        left = _compile(node[2], names, mode)
+        right = _compile(node[3], names, mode)
+        if hasattr(left, "constant") and hasattr(right, "constant"):
+            try:
+                return _constant(function(left.constant, right.constant))
+            except (ArithmeticError, ValueError):
+                # e.g. 1/0: leave it to fail when evaluated, like any other input
+                pass
+        return lambda variables: function(left(variables), right(variables))
+    
+    _, name, arguments, position = node
+    if name not in mode.functions:
+        if name in FUNCTIONS:
+            raise CalcError(f"{name}() does not give exact results, so it is not available in {mode.name} mode",
+                            position)
+        raise CalcError(f"Unknown function {name!r}", position)
+    function, fewest, most = mode.functions[name]
+    if len(arguments) < fewest or (most is not None and len(arguments) > most):
+        expected = fewest if fewest == most else f"{fewest} or more" if most is None else f"{fewest} to {most}"
+        raise CalcError(f"{name}() takes {expected} argument(s), got {len(arguments)}", position)
+    compiled = [_compile(argument, names, mode) for argument in arguments]
+    if len(compiled) == 1:
+        argument = compiled[0]
+        return lambda variables: function(argument(variables))
+    return lambda variables: function(*[argument(variables) for argument in compiled])
+
+
+class Formula:
+    """A compiled formula; call evaluate() with variable values as often as needed."""
+    
+    __slots__ = ("text", "mode", "variables", "_evaluate")
+    
+    def __init__(self, text, mode="float", precision=DEFAULT_PRECISION):
+        names = set()
+        self.mode = number_mode(mode, precision)
+        tree = parse(text)
+        if self.mode.context is None:
+            self._evaluate = _compile(tree, names, self.mode)
+        else:
+            # Constants are folded at the mode's precision too
+            with localcontext(self.mode.context):
+                self._evaluate = _compile(tree, names, self.mode)
+        self.text = text
+        self.variables = frozenset(names)   # variable names the formula needs
+    
+    def evaluate(self, variables=None, **more):
+        """The formula's value for the given variables (a dict, keywords, or both).
+        
+        Values may be ints or floats. Decimal and fraction mode also accept
+        numeric strings, and convert every value through its text, so 0.1
+        means exactly 0.1. Float mode passes values through unconverted (its
+        fast path), so strings must be turned into numbers first.
+        """
+        if more:
+            variables = {**(variables or {}), **more}
+        variables = variables or {}
+        mode = self.mode
+        try:
+            if mode.convert is None:
+                # Float fast path: no conversion, no context
+                result = self._evaluate(variables)
+            else:
+                variables = {name: mode.convert(variables[name]) for name in self.variables}
+                if mode.context is None:
+                    result = self._evaluate(variables)
+                else:
+                    with localcontext(mode.context):
+                        result = self._evaluate(variables)
+        except KeyError as e:
+            raise CalcError(f"No value given for {e.args[0]!r}") from None
+        except ZeroDivisionError:
+            raise CalcError("Cannot divide by zero") from None
+        except (OverflowError, Overflow):
+            raise CalcError("Result is too large") from None
+        except InvalidOperation:
+            # Decimal's version of a domain error, e.g. sqrt(-1)
+            raise CalcError("Math error: the result is undefined") from None
+        except (ValueError, TypeError) as e:
+            # math domain errors, e.g. sqrt(-1)
+            raise CalcError(f"Math error: {e}") from None
+        if isinstance(result, complex):
+            # A negative number to a fractional power
+            raise CalcError("Result is not a real number")
+        if isinstance(result, Fraction):
+            # Products and sums can still outgrow the limit that powers are held to
+            _check_exact_size(result)
+        return result
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_formula(text, mode, precision):
+    return Formula(text, mode, precision)
+
+
+def compile_formula(text, mode="float", precision=DEFAULT_PRECISION):
+    """The compiled Formula for text in the given number mode, from the cache when it was compiled before."""
+    # Precision only means something in decimal mode; don't let it split the cache otherwise
+    return _cached_formula(text, mode, precision if mode == "decimal" else None)
+
+
+def evaluate(text, variables=None, mode="float", precision=DEFAULT_PRECISION, **more):
+    """Compiles text (or reuses its cached compilation) and evaluates it."""
+    return compile_formula(text, mode, precision).evaluate(variables, **more)
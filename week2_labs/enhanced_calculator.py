@@ -1 +1,239 @@
-# Enhanced Calculator - Coming Soon 
+# enhanced_calculator.py
+# CCCS 106 - Week 2 Lab Exercise
+# Enhanced Calculator: formulas with variables, functions and tables of values
+
+from decimal import Decimal
+from fractions import Fraction
+
+import flet as ft
+from calc_engine import CONSTANTS, DEFAULT_PRECISION, FUNCTIONS, MAX_PRECISION, CalcError, compile_formula, evaluate
+
+HISTORY_SIZE = 10
+MAX_TABLE_ROWS = 1000
+
+
+def parse_variables(text, mode="float", precision=DEFAULT_PRECISION):
+    """Reads "x = 2, y = x * 3" into {"x": 2.0, "y": 6.0}; each value may use the ones before it."""
+    variables = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, sep, formula = part.partition("=")
+        name = name.strip()
+        if not sep or not name.isidentifier():
+            raise CalcError(f"Write variables as name = value, not {part.strip()!r}")
+        variables[name] = evaluate(formula, variables, mode, precision)
+    return variables
+
+
+def format_number(value):
+    if isinstance(value, (Decimal, Fraction)):
+        # Exact modes show every digit they computed, e.g. 0.3 or 1/3
+        return str(value)
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.12g}"
+
+
+def main(page: ft.Page):
+    # Page configuration
+    page.title = "CCCS 106 - Enhanced Calculator"
+    page.window.width = 560
+    page.window.height = 720
+    page.padding = 20
+    page.scroll = ft.ScrollMode.AUTO
+    page.theme_mode = ft.ThemeMode.LIGHT
+    
+    # Title
+    title = ft.Text(
+        "Enhanced Calculator",
+        size=26,
+        weight=ft.FontWeight.BOLD,
+        text_align=ft.TextAlign.CENTER,
+        color=ft.Colors.TEAL_700
+    )
+    
+    # Input fields
+    formula_input = ft.TextField(
+        label="Formula",
+        hint_text="e.g. 3*x^2 + 2*x - sqrt(y) / 4",
+        width=500,
+        autofocus=True,
+        on_submit=lambda e: calculate(e)
+    )
+    variables_input = ft.TextField(
+        label="Variables",
+        hint_text="e.g. x = 2, y = 16",
+        width=500,
+        on_submit=lambda e: calculate(e)
+    )
+    
+    # Number mode: float is fastest; decimal and fraction avoid binary rounding (0.1 + 0.2 = 0.3)
+    mode_dropdown = ft.Dropdown(
+        label="Numbers",
+        width=200,
+        value="float",
+        options=[
+            ft.dropdown.Option("float", "Float (fastest)"),
+            ft.dropdown.Option("decimal", "Decimal"),
+            ft.dropdown.Option("fraction", "Fraction (exact)"),
+        ]
+    )
+    precision_input = ft.TextField(
+        label="Decimal digits",
+        value=str(DEFAULT_PRECISION),
+        width=130,
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+    
+    # Output
+    result_text = ft.Text("", size=22, weight=ft.FontWeight.BOLD, selectable=True)
+    history_column = ft.Column(spacing=2)
+    
+    # Table of values: one variable stepped across a range, everything else from the Variables field
+    table_variable = ft.TextField(label="Vary", value="x", width=80)
+    table_start = ft.TextField(label="From", value="0", width=100)
+    table_stop = ft.TextField(label="To", value="10", width=100)
+    table_steps = ft.TextField(label="Steps", value="10", width=100, keyboard_type=ft.KeyboardType.NUMBER)
+    table_rows = ft.Column(spacing=2)
+    
+    help_text = ft.Text(
+        "Operators: + - * / // % ^ (or **)   Constants: " + ", ".join(CONSTANTS) +
+        "\nFunctions: " + ", ".join(FUNCTIONS),
+        size=12,
+        color=ft.Colors.GREY_600
+    )
+    
+    # Functions
+    def show_error(message):
+        result_text.value = message
+        result_text.color = ft.Colors.RED_600
+    
+    def number_mode():
+        if mode_dropdown.value != "decimal":
+            return mode_dropdown.value, DEFAULT_PRECISION
+        try:
+            precision = int(precision_input.value)
+        except ValueError:
+            raise CalcError("Decimal digits must be a whole number") from None
+        if not 1 <= precision <= MAX_PRECISION:
+            raise CalcError(f"Decimal digits must be between 1 and {MAX_PRECISION}")
+        return "decimal", precision
+    
+    def reuse(formula, variables, mode):
+        formula_input.value = formula
+        variables_input.value = variables
+        mode_dropdown.value = mode
+        page.update()
+    
+    def add_history(formula, variables, mode, value):
+        entry = f"{formula} = {format_number(value)}" + (f"   [{variables}]" if variables.strip() else "")
+        if mode != "float":
+            entry += f"   ({mode})"
+        history_column.controls.insert(0, ft.TextButton(
+            entry,
+            on_click=lambda e: reuse(formula, variables, mode)
+        ))
+        del history_column.controls[HISTORY_SIZE:]
+    
+    def calculate(e):
+        formula = formula_input.value or ""
+        if not formula.strip():
+            show_error("Please enter a formula!")
+            page.update()
+            return
+        try:
+            mode, precision = number_mode()
+            value = evaluate(formula, parse_variables(variables_input.value or "", mode, precision), mode, precision)
+            result_text.value = f"= {format_number(value)}"
+            result_text.color = ft.Colors.GREEN_700
+            add_history(formula, variables_input.value or "", mode, value)
+        except CalcError as ex:
+            show_error(f"Error: {ex}")
+        page.update()
+    
+    def build_table(e):
+        table_rows.controls.clear()
+        try:
+            mode, precision = number_mode()
+            formula = compile_formula(formula_input.value or "", mode, precision)
+            variables = parse_variables(variables_input.value or "", mode, precision)
+            name = (table_variable.value or "").strip()
+            start = evaluate(table_start.value or "", None, mode, precision)
+            stop = evaluate(table_stop.value or "", None, mode, precision)
+            try:
+                steps = int(table_steps.value)
+            except ValueError:
+                raise CalcError("Steps must be a whole number") from None
+            if not name.isidentifier():
+                raise CalcError("Enter the name of the variable to vary")
+            if not 1 <= steps <= MAX_TABLE_ROWS:
+                raise CalcError(f"Steps must be between 1 and {MAX_TABLE_ROWS}")
+            # Compiled once above; each row only evaluates
+            for i in range(steps + 1):
+                variables[name] = start + (stop - start) * i / steps
+                try:
+                    value = format_number(formula.evaluate(variables))
+                except CalcError as ex:
+                    value = str(ex)
+                table_rows.controls.append(ft.Text(f"{name} = {format_number(variables[name])}   →   {value}", size=14))
+            result_text.value = ""
+        except CalcError as ex:
+            show_error(f"Error: {ex}")
+        page.update()
+    
+    def clear_all(e):
+        formula_input.value = ""
+        variables_input.value = ""
+        result_text.value = ""
+        table_rows.controls.clear()
+        page.update()
+    
+    # Buttons
+    calculate_btn = ft.ElevatedButton(
+        "Calculate",
+        on_click=calculate,
+        bgcolor=ft.Colors.TEAL_600,
+        color=ft.Colors.WHITE,
+        width=130
+    )
+    
+    table_btn = ft.ElevatedButton(
+        "Make Table",
+        on_click=build_table,
+        bgcolor=ft.Colors.INDIGO_600,
+        color=ft.Colors.WHITE,
+        width=130
+    )
+    
+    clear_btn = ft.ElevatedButton(
+        "Clear",
+        on_click=clear_all,
+        bgcolor=ft.Colors.GREY_600,
+        color=ft.Colors.WHITE,
+        width=130
+    )
+    
+    # Layout
+    page.add(
+        ft.Column([
+            title,
+            ft.Divider(),
+            formula_input,
+            variables_input,
+            ft.Row([mode_dropdown, precision_input], spacing=10),
+            ft.Row([calculate_btn, table_btn, clear_btn], spacing=10),
+            result_text,
+            help_text,
+            ft.Divider(),
+            ft.Text("Table of Values:", size=16, weight=ft.FontWeight.BOLD),
+            ft.Row([table_variable, table_start, table_stop, table_steps], spacing=10),
+            table_rows,
+            ft.Divider(),
+            ft.Text("History:", size=16, weight=ft.FontWeight.BOLD),
+            history_column,
+        ], spacing=10)
+    )
+
+if __name__ == "__main__":
+    ft.app(target=main)
@@ -0,0 +1,166 @@
+# bench_login.py
+"""Login load benchmark: N concurrent logins through AuthService, the code path behind login_click.
+
+Usage (from week3_labs/):
+
+    python benchmarks/bench_login.py                              # SQLite, 2000 logins, 50 at a time
+    python benchmarks/bench_login.py --logins 5000 --concurrency 200 --output results.json
+    python benchmarks/bench_login.py --guard                      # with the rate limiter in front
+
+The default SQLite backend needs no server: users are seeded into a fresh
+database in a temporary directory. --backend mysql runs against the users
+table configured by the USERLOGIN_MYSQL_* variables, which must already be
+migrated (python src/backends.py migrate) and hold the users bench-user-0 ..
+bench-user-(N-1) with password "bench-password".
+Results are written as JSON so runs can be diffed in review.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from auth_service import AuthError, AuthRateLimited, AuthService, AuthTimeout  # noqa: E402
+from backends import MySQLBackend, SQLiteBackend  # noqa: E402
+from db_connection import POOL_SIZE, ConnectionPool  # noqa: E402
+from passwords import hash_password, preferred_scheme  # noqa: E402
+from rate_limit import LoginGuard  # noqa: E402
+
+DEFAULT_USERS = 1_000
+DEFAULT_LOGINS = 2_000
+DEFAULT_CONCURRENCY = 50
+DEFAULT_SEED = 106
+PASSWORD = "bench-password"
+DISTINCT_HASHES = 8   # seeded users share a few precomputed hashes, so seeding is not hours of hashing
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p95_ms": pick(0.95) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def seed_sqlite(path, users, pool_size):
+    backend = SQLiteBackend(path, pool_size=pool_size)
+    backend.ensure_schema()
+    hashes = [hash_password(PASSWORD) for _ in range(DISTINCT_HASHES)]
+    backend.add_users((f"bench-user-{i}", hashes[i % DISTINCT_HASHES]) for i in range(users))
+    return backend
+
+
+def make_attempts(rng, users, logins, wrong_ratio, unknown_ratio):
+    attempts = []
+    for _ in range(logins):
+        roll = rng.random()
+        if roll < unknown_ratio:
+            attempts.append((f"nobody-{rng.randrange(users)}", PASSWORD))
+        elif roll < unknown_ratio + wrong_ratio:
+            attempts.append((f"bench-user-{rng.randrange(users)}", f"wrong-{rng.randrange(1_000_000)}"))
+        else:
+            attempts.append((f"bench-user-{rng.randrange(users)}", PASSWORD))
+    return attempts
+
+
+async def run_logins(service, attempts, concurrency, clients):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = {"ok": 0, "wrong": 0, "rate_limited": 0, "timeout": 0, "error": 0}
+
+    async def one(i, username, password):
+        async with gate:
+            started = time.perf_counter()
+            try:
+                ok = await service.authenticate(username, password, client=f"client-{i % clients}")
+                outcomes["ok" if ok else "wrong"] += 1
+            except AuthRateLimited:
+                outcomes["rate_limited"] += 1
+            except AuthTimeout:
+                outcomes["timeout"] += 1
+            except AuthError:
+                outcomes["error"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, u, p) for i, (u, p) in enumerate(attempts)))
+    return time.perf_counter() - started, latencies, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent logins through the auth service.")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--logins", type=int, default=DEFAULT_LOGINS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--clients", type=int, default=100, help="distinct client ids the logins come from")
+    parser.add_argument("--wrong-ratio", type=float, default=0.1)
+    parser.add_argument("--unknown-ratio", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=POOL_SIZE, help="lookup workers and connection pool size")
+    parser.add_argument("--hashers", type=int, default=None, help="hash workers; default one per core")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-login timeout in seconds")
+    parser.add_argument("--guard", action="store_true", help="keep the rate limiter and failure cache on")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default="bench_login_results.json")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    if args.backend == "sqlite":
+        print(f"Seeding {args.users} users...")
+        backend = seed_sqlite(os.path.join(tmp.name, "users.db"), args.users, args.workers)
+    else:
+        # Its own pool rather than the process-wide one, so --workers sizes it
+        backend = MySQLBackend(ConnectionPool(size=args.workers))
+    # Without --guard the limits never bite, so every attempt reaches the database and the hasher
+    guard = LoginGuard() if args.guard else LoginGuard(user_attempts=math.inf, client_attempts=math.inf,
+                                                       failure_ttl=0)
+    service = AuthService(backend, workers=args.workers, hashers=args.hashers, timeout=args.timeout, guard=guard)
+
+    attempts = make_attempts(random.Random(args.seed), args.users, args.logins, args.wrong_ratio,
+                             args.unknown_ratio)
+    print(f"Running {args.logins} logins, {args.concurrency} at a time, against {args.backend}...")
+    elapsed, latencies, outcomes = asyncio.run(run_logins(service, attempts, args.concurrency, args.clients))
+    service.close()
+    tmp.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "hash_scheme": preferred_scheme(),
+            "seed": args.seed,
+        },
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "elapsed_s": elapsed,
+        "logins_per_sec": len(attempts) / elapsed,
+        "latency": percentiles(latencies),
+        "outcomes": outcomes,
+        "guard": service.stats(),
+    }
+    print(f"  {report['logins_per_sec']:.1f} logins/s; p50 {report['latency']['p50_ms']:.1f} ms, "
+          f"p95 {report['latency']['p95_ms']:.1f} ms, p99 {report['latency']['p99_ms']:.1f} ms; {outcomes}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
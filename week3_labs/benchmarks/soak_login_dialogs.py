@@ -0,0 +1,145 @@
+# soak_login_dialogs.py
+"""Soak check: thousands of logins through the real login_click must not grow page.overlay or memory.
+
+Usage (from week3_labs/):
+
+    python benchmarks/soak_login_dialogs.py                   # 5000 logins
+    python benchmarks/soak_login_dialogs.py --logins 20000
+
+main() is run against a headless stand-in for ft.Page, with a seeded
+SQLite backend. Each round logs in with the right password, a repeated
+wrong one, or empty fields, then clicks the dialog's OK. The script exits with
+status 1 if the overlay grows or traced memory grows by more than
+--max-growth-kb after warm-up.
+"""
+
+import argparse
+import asyncio
+import gc
+import math
+import os
+import secrets
+import sys
+import tempfile
+import tracemalloc
+import types
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+# A throwaway secret, so the soak never writes a session.key file
+os.environ.setdefault("USERLOGIN_SESSION_SECRET", secrets.token_hex(32))
+
+import flet as ft  # noqa: E402
+
+import auth_service  # noqa: E402
+import main as login_app  # noqa: E402
+from backends import SQLiteBackend  # noqa: E402
+from passwords import hash_password  # noqa: E402
+from rate_limit import LoginGuard  # noqa: E402
+
+PASSWORD = "soak-password"
+WARMUP_LOGINS = 200
+
+
+class FakeClientStorage:
+    def __init__(self):
+        self._items = {}
+
+    def get(self, key):
+        return self._items.get(key)
+
+    def set(self, key, value):
+        self._items[key] = value
+
+    def remove(self, key):
+        self._items.pop(key, None)
+
+
+class FakePage:
+    """Just enough of ft.Page for main(): records controls and counts update() calls."""
+
+    def __init__(self):
+        self.window = types.SimpleNamespace(center=lambda: None)
+        self.overlay = []
+        self.controls = []
+        self.client_storage = FakeClientStorage()
+        self.client_ip = "127.0.0.1"
+        self.session_id = "soak"
+        self.updates = 0
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    def update(self, *controls):
+        self.updates += 1
+
+
+def find(control, kind):
+    """Depth-first search for the first control of type kind."""
+    if isinstance(control, kind):
+        return control
+    for child in getattr(control, "controls", None) or []:
+        found = find(child, kind)
+        if found is not None:
+            return found
+    return None
+
+
+async def soak(page, logins):
+    column = page.controls[0]
+    username, password = [c for c in column.controls if isinstance(c, ft.TextField)]
+    button = find(column, ft.ElevatedButton)
+    # The wrong password goes to another username: soak's successful logins clear its cached failures
+    rounds = [("soak", PASSWORD), ("intruder", "wrong"), ("", "")]
+    overlay_sizes = []
+    baseline = None
+    for i in range(logins):
+        username.value, password.value = rounds[i % len(rounds)]
+        await button.on_click(None)
+        shown = [dialog for dialog in page.overlay if dialog.open]
+        assert len(shown) == 1, f"expected one open dialog, found {len(shown)}"
+        # Click OK
+        shown[0].actions[-1].on_click(None)
+        overlay_sizes.append(len(page.overlay))
+        if i + 1 == WARMUP_LOGINS:
+            gc.collect()
+            baseline = tracemalloc.take_snapshot()
+    gc.collect()
+    return overlay_sizes, baseline, tracemalloc.take_snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that repeated logins do not leak dialogs or memory.")
+    parser.add_argument("--logins", type=int, default=5000)
+    parser.add_argument("--max-growth-kb", type=float, default=256.0)
+    args = parser.parse_args()
+    if args.logins <= WARMUP_LOGINS:
+        parser.error(f"--logins must be more than the {WARMUP_LOGINS} warm-up logins")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteBackend(os.path.join(tmp, "users.db"))
+        backend.ensure_schema()
+        backend.add_user("soak", hash_password(PASSWORD))
+        # No attempt limits, so every round reaches its intended dialog; repeats of the wrong password still hit the cache
+        guard = LoginGuard(user_attempts=math.inf, client_attempts=math.inf)
+        auth_service._service = auth_service.AuthService(backend, timeout=60.0, guard=guard)
+
+        page = FakePage()
+        login_app.main(page)
+        tracemalloc.start()
+        overlay_sizes, before, after = asyncio.run(soak(page, args.logins))
+        tracemalloc.stop()
+        auth_service._service.close()
+
+    growth = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / 1024
+    stats = auth_service._service.stats()
+    print(f"{args.logins} logins: overlay {min(overlay_sizes)}..{max(overlay_sizes)} controls, "
+          f"memory {growth:+.1f} KB after warm-up, {page.updates} page updates; attempts {stats}")
+    leaked = max(overlay_sizes) != min(overlay_sizes) or growth > args.max_growth_kb
+    if leaked:
+        print("FAIL: the login page is leaking")
+    sys.exit(1 if leaked else 0)
+
+
+if __name__ == "__main__":
+    main()
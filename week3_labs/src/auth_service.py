@@ -0,0 +1,147 @@
+import asyncio
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import get_backend
+from db_connection import POOL_SIZE
+from passwords import hash_password, needs_rehash, verify_password
+from rate_limit import LoginGuard
+
+LOGIN_TIMEOUT = 5.0        # seconds an attempt may take before the UI gives up on it
+
+
+class AuthError(Exception):
+    """Raised when the credential check could not be completed."""
+    pass
+
+
+class AuthTimeout(AuthError):
+    """Raised when the credential check takes longer than the attempt timeout."""
+    pass
+
+
+class AuthRateLimited(AuthError):
+    """Raised when an attempt is turned away for coming too often; retry_after is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AuthService:
+    """Checks credentials without blocking the Flet event loop on the database or on password hashing.
+
+    The users table lives behind backend (MySQL or SQLite, see backends.py).
+    Lookups run on one worker per pooled connection (more would only queue on
+    the pool). Hash verification is CPU-bound and runs on a separate pool
+    sized to the cores; scrypt, bcrypt and argon2 release the GIL while they
+    work, so threads scale across cores. A timed-out or cancelled attempt
+    returns to the UI at once; its lookup runs on until the query ends, which
+    the backend bounds. Retry storms and repeated wrong passwords are
+    turned away by the guard before they reach the database.
+    """
+
+    def __init__(self, backend=None, workers=POOL_SIZE, hashers=None, timeout=LOGIN_TIMEOUT, guard=None):
+        self.backend = backend or get_backend()
+        self.timeout = timeout
+        self.guard = guard or LoginGuard()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        self._hashers = ThreadPoolExecutor(max_workers=hashers or os.cpu_count() or 1, thread_name_prefix="auth-hash")
+        self._dummy_hash = None
+        # Rehash tasks outlive the login that started them; keep them referenced until done
+        self._upgrades = set()
+
+    def _lookup(self, username):
+        """Returns (password_hash, legacy_password) for username, or None if there is no such user.
+
+        The schema must already be in place (python src/backends.py migrate);
+        logins never run DDL.
+        """
+        return self.backend.find_user(username)
+
+    def _verify_unknown(self, password):
+        # Same CPU cost as a real check, so response times do not reveal which usernames exist
+        if self._dummy_hash is None:
+            self._dummy_hash = hash_password("")
+        verify_password(password, self._dummy_hash)
+        return False
+
+    async def _authenticate(self, username, password):
+        loop = asyncio.get_running_loop()
+        user = await loop.run_in_executor(self._executor, self._lookup, username)
+        if user is None:
+            return await loop.run_in_executor(self._hashers, self._verify_unknown, password)
+
+        stored, legacy = user
+        if stored is None:
+            ok = legacy is not None and hmac.compare_digest(legacy.encode("utf-8"), password.encode("utf-8"))
+        else:
+            ok = await loop.run_in_executor(self._hashers, verify_password, password, stored)
+        if ok and (stored is None or needs_rehash(stored)):
+            upgrade = asyncio.ensure_future(self._rehash(username, password))
+            self._upgrades.add(upgrade)
+            upgrade.add_done_callback(self._upgrades.discard)
+        return ok
+
+    async def _rehash(self, username, password):
+        """Replaces a plaintext or outdated hash with one from the current scheme."""
+        loop = asyncio.get_running_loop()
+        try:
+            password_hash = await loop.run_in_executor(self._hashers, hash_password, password)
+            await loop.run_in_executor(self._executor, self.backend.store_hash, username, password_hash)
+        except self.backend.errors as e:
+            # The next successful login tries again
+            print(f"Password rehash failed: {e}")
+
+    async def authenticate(self, username, password, timeout=None, client=None):
+        """Returns True if the credentials match a user.
+
+        client identifies where the attempt comes from (an IP address or
+        session id) for per-client rate limiting. Raises AuthRateLimited if
+        the username or client has made too many attempts, AuthTimeout after
+        timeout seconds (default: the service's), or AuthError if the database
+        fails. Cancelling the awaiting task abandons the attempt.
+        """
+        outcome = self.guard.check(username, password, client)
+        if outcome == "cached_failure":
+            return False
+        if outcome == "rate_limited":
+            wait = self.guard.retry_after(username, client)
+            raise AuthRateLimited(f"Too many login attempts; try again in {wait:.0f}s", wait)
+
+        try:
+            ok = await asyncio.wait_for(self._authenticate(username, password), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise AuthTimeout(f"Login check took longer than {timeout or self.timeout}s")
+        except self.backend.errors as e:
+            raise AuthError(str(e)) from e
+        if ok:
+            self.guard.record_success(username)
+        else:
+            self.guard.record_failure(username, password)
+        return ok
+
+    def stats(self):
+        """Counts of login attempts forwarded to the database and rejected in memory."""
+        return self.guard.stats()
+
+    def close(self):
+        """Stops the workers and closes the backend's connections; queued attempts are dropped."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._hashers.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_auth_service():
+    """The process-wide auth service, shared by every session like the connection pool."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AuthService()
+        return _service
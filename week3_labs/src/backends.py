@@ -0,0 +1,227 @@
+import argparse
+import getpass
+import os
+import sqlite3
+
+import mysql.connector
+
+from db_connection import POOL_SIZE, ConnectionPool, PoolTimeout, get_pool
+
+BACKEND_ENV = "USERLOGIN_BACKEND"        # "mysql" (the default) or "sqlite"
+SQLITE_PATH_ENV = "USERLOGIN_SQLITE_PATH"
+SQLITE_PATH = "users.db"
+SQLITE_BUSY_TIMEOUT = 5.0                # seconds a statement waits for a writer's lock
+QUERY_TIMEOUT_MS = 3000                  # server-side cap on the MySQL lookup, so abandoned workers finish too
+
+
+class MySQLBackend:
+    """The users table in MySQL, reached through the shared connection pool.
+
+    Every backend offers the same methods and an errors tuple of the
+    exceptions that mean the database failed; AuthService relies on nothing
+    else.
+    """
+
+    errors = (mysql.connector.Error, PoolTimeout)
+
+    def __init__(self, pool=None):
+        self.pool = pool
+
+    def _connection(self):
+        return (self.pool or get_pool()).connection()
+
+    def _column_exists(self, cursor, table, column):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+            (table, column)
+        )
+        return cursor.fetchone()[0] > 0
+
+    def _leading_index_exists(self, cursor, table, column):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s AND SEQ_IN_INDEX = 1",
+            (table, column)
+        )
+        return cursor.fetchone()[0] > 0
+
+    def ensure_schema(self):
+        """Adds the password_hash column and a username index to the users table if they are missing.
+
+        The old plaintext password column is kept until every user has logged
+        in once and been upgraded to a hash. This is a setup step, run with
+        python src/backends.py migrate by an account allowed to ALTER the
+        table; logins never call it.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            if not self._column_exists(cursor, "users", "password_hash"):
+                cursor.execute("ALTER TABLE users ADD COLUMN password_hash VARCHAR(255) NULL")
+            if not self._leading_index_exists(cursor, "users", "username"):
+                cursor.execute("CREATE INDEX idx_users_username ON users (username)")
+            cursor.close()
+
+    def find_user(self, username):
+        """Returns (password_hash, legacy_password) for username, or None if there is no such user."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Only the hash column, found through the username index
+            cursor.execute(
+                f"SELECT /*+ MAX_EXECUTION_TIME({QUERY_TIMEOUT_MS}) */ password_hash FROM users "
+                "WHERE username = %s LIMIT 1",
+                (username,)
+            )
+            row = cursor.fetchone()
+            legacy = None
+            if row is not None and row[0] is None:
+                # Not upgraded yet: fall back to the plaintext column this once
+                cursor.execute("SELECT password FROM users WHERE username = %s LIMIT 1", (username,))
+                legacy = cursor.fetchone()[0]
+            cursor.close()
+        return None if row is None else (row[0], legacy)
+
+    def store_hash(self, username, password_hash):
+        """Replaces the user's password with password_hash and clears the plaintext column."""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE users SET password_hash = %s, password = '' WHERE username = %s",
+                (password_hash, username)
+            )
+            cursor.close()
+
+    def add_user(self, username, password_hash):
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO users (username, password, password_hash) VALUES (%s, '', %s)",
+                (username, password_hash)
+            )
+            cursor.close()
+
+    def close(self):
+        (self.pool or get_pool()).close()
+
+
+class _SQLiteConnection:
+    """A SQLite connection with the few extras ConnectionPool expects of a MySQL one."""
+
+    def __init__(self, path):
+        # Autocommit mode, like the pooled MySQL connections
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self.autocommit = True
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend:
+    """A local users table in a SQLite file, for running and benchmarking without a MySQL server.
+
+    It goes through the same ConnectionPool as MySQL, so pool settings behave
+    the same way here; pool_size sizes the pool it creates when none is given.
+    """
+
+    errors = (sqlite3.Error, PoolTimeout)
+
+    def __init__(self, path=SQLITE_PATH, pool=None, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool = pool or ConnectionPool(size=pool_size, connect=lambda: _SQLiteConnection(path))
+
+    def ensure_schema(self):
+        """Creates the users table and its username index if they do not exist yet; see MySQLBackend.ensure_schema."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    password TEXT NOT NULL DEFAULT '',
+                    password_hash TEXT
+                )
+            """)
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(users)")}
+            if "password_hash" not in columns:
+                cursor.execute("ALTER TABLE users ADD COLUMN password_hash TEXT")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)")
+            cursor.close()
+
+    def find_user(self, username):
+        """Returns (password_hash, legacy_password) for username, or None if there is no such user."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT password_hash FROM users WHERE username = ? LIMIT 1", (username,))
+            row = cursor.fetchone()
+            legacy = None
+            if row is not None and row[0] is None:
+                cursor.execute("SELECT password FROM users WHERE username = ? LIMIT 1", (username,))
+                legacy = cursor.fetchone()[0]
+            cursor.close()
+        return None if row is None else (row[0], legacy)
+
+    def store_hash(self, username, password_hash):
+        """Replaces the user's password with password_hash and clears the plaintext column."""
+        with self.pool.connection() as conn:
+            conn.cursor().execute(
+                "UPDATE users SET password_hash = ?, password = '' WHERE username = ?",
+                (password_hash, username)
+            )
+
+    def add_user(self, username, password_hash):
+        with self.pool.connection() as conn:
+            conn.cursor().execute(
+                "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                (username, password_hash)
+            )
+
+    def add_users(self, rows):
+        """Inserts (username, password_hash) rows in one transaction."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            cursor.executemany("INSERT INTO users (username, password_hash) VALUES (?, ?)", rows)
+            cursor.execute("COMMIT")
+            cursor.close()
+
+    def close(self):
+        self.pool.close()
+
+
+def get_backend():
+    """The backend named by USERLOGIN_BACKEND: MySQL unless it says "sqlite"."""
+    name = os.environ.get(BACKEND_ENV, "mysql").lower()
+    if name == "sqlite":
+        return SQLiteBackend(os.environ.get(SQLITE_PATH_ENV, SQLITE_PATH))
+    if name == "mysql":
+        return MySQLBackend()
+    raise ValueError(f"Unknown {BACKEND_ENV} {name!r}; expected 'mysql' or 'sqlite'")
+
+
+if __name__ == "__main__":
+    # Sets up the configured backend: python src/backends.py migrate, then add-user alice
+    from passwords import hash_password
+
+    parser = argparse.ArgumentParser(description="Set up the configured backend and manage its users.")
+    parser.add_argument("command", choices=["migrate", "add-user"])
+    parser.add_argument("username", nargs="?")
+    args = parser.parse_args()
+    if args.command == "add-user" and not args.username:
+        parser.error("add-user needs a username")
+
+    backend = get_backend()
+    if args.command == "migrate":
+        backend.ensure_schema()
+        print("Schema is up to date")
+    else:
+        backend.add_user(args.username, hash_password(getpass.getpass("Password: ")))
+        print(f"Added {args.username}")
+    backend.close()
@@ -1,9 +1,133 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
 
+# Overridable from the environment, so deployments and benchmarks need no code edits
+DB_CONFIG = {
+    "host": os.environ.get("USERLOGIN_MYSQL_HOST", "localhost"),
+    "port": int(os.environ.get("USERLOGIN_MYSQL_PORT", "3306")),
+    "user": os.environ.get("USERLOGIN_MYSQL_USER", "root"),
+    "password": os.environ.get("USERLOGIN_MYSQL_PASSWORD", "admin123"),
+    "database": os.environ.get("USERLOGIN_MYSQL_DATABASE", "fletapp"),
+}
+
+POOL_SIZE = 5
+ACQUIRE_TIMEOUT = 5.0        # seconds to wait for a free connection
+MAX_CONNECTION_AGE = 1800    # seconds; older connections are closed and replaced
+PING_AFTER_IDLE = 30         # seconds idle before a connection is health-checked on borrow
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the acquire timeout."""
+    pass
+
+
 def connect_db():
-    return mysql.connector.connect(
-        host="localhost",   
-        user="root",        
-        password="admin123",        
-        database="fletapp" 
-    )
+    """Opens a new, unpooled connection."""
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """At most size MySQL connections, opened on demand and reused across logins.
+
+    Borrowed connections are health-checked after sitting idle, recycled once
+    they reach max_age, and discarded if the borrower raises, so a broken
+    connection never goes back to the pool.
+    """
+
+    def __init__(self, size=POOL_SIZE, acquire_timeout=ACQUIRE_TIMEOUT, max_age=MAX_CONNECTION_AGE,
+                 ping_after=PING_AFTER_IDLE, connect=connect_db):
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self._connect = connect
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._closed = False
+
+    def _open(self):
+        conn = self._connect()
+        # Each statement commits on its own, so a returned connection never holds an old snapshot
+        conn.autocommit = True
+        return _PooledConnection(conn)
+
+    def _discard(self, entry):
+        try:
+            entry.conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _checkout(self):
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            now = time.monotonic()
+            if now - entry.created >= self.max_age:
+                self._discard(entry)
+                continue
+            if now - entry.last_used >= self.ping_after:
+                try:
+                    entry.conn.ping(reconnect=False)
+                except mysql.connector.Error:
+                    self._discard(entry)
+                    continue
+            return entry
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection, returning it to the pool when the block exits."""
+        if self._closed:
+            raise PoolTimeout("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeout(f"No database connection available after {self.acquire_timeout}s")
+        try:
+            entry = self._checkout()
+            try:
+                yield entry.conn
+            except BaseException:
+                self._discard(entry)
+                raise
+            entry.last_used = time.monotonic()
+            if self._closed:
+                self._discard(entry)
+            else:
+                self._idle.put(entry)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes idle connections; borrowed ones are closed as they come back."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide connection pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
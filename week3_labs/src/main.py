@@ -1,6 +1,7 @@
+import asyncio
 import flet as ft
-import mysql.connector
-from db_connection import connect_db
+from auth_service import AuthError, AuthRateLimited, AuthTimeout, get_auth_service
+from sessions import STORAGE_KEY, get_session_signer
 
 def main(page: ft.Page):
     page.window.center()
@@ -11,7 +12,7 @@ def main(page: ft.Page):
     page.window.height = 350
     page.window.width = 400
     page.bgcolor = ft.Colors.AMBER_ACCENT
-
+    
     log_in_title = ft.Text(
         "User Login",
         size=20,
@@ -19,7 +20,7 @@ def main(page: ft.Page):
         font_family="Arial",
         text_align=ft.TextAlign.CENTER
     )
-
+    
     username_input = ft.TextField(
         label="User name",
         hint_text="Enter your user name",
@@ -29,7 +30,7 @@ def main(page: ft.Page):
         prefix_icon=ft.Icons.PERSON,
         bgcolor=ft.Colors.LIGHT_BLUE_ACCENT
     )
-
+    
     password = ft.TextField(
         label="Password",
         hint_text="Enter your password",
@@ -41,93 +42,94 @@ def main(page: ft.Page):
         prefix_icon=ft.Icons.LOCK,
         bgcolor=ft.Colors.LIGHT_BLUE_ACCENT
     )
-
-    async def login_click(e):
-        success_dialog = ft.AlertDialog(
-            title=ft.Text("Login Successful"),
-            content=ft.Text(
-                f"Welcome, {username_input.value}!",
-                text_align=ft.TextAlign.CENTER
-            ),
-            actions=[
-                ft.TextButton("OK", on_click=lambda e: close_dialog(success_dialog))
-            ],
-            icon=ft.Icon(ft.Icons.CHECK_CIRCLE, color=ft.Colors.GREEN)
-        )
-        
-        failure_dialog = ft.AlertDialog(
-            title=ft.Text("Login Failed"),
-            content=ft.Text(
-                "Invalid username or password",
-                text_align=ft.TextAlign.CENTER
-            ),
-            actions=[
-                ft.TextButton("OK", on_click=lambda e: close_dialog(failure_dialog))
-            ],
-            icon=ft.Icon(ft.Icons.ERROR, color=ft.Colors.RED)
-        )
-        
-        invalid_input_dialog = ft.AlertDialog(
-            title=ft.Text("Input Error"),
-            content=ft.Text(
-                "Please enter username and password",
-                text_align=ft.TextAlign.CENTER
-            ),
-            actions=[
-                ft.TextButton("OK", on_click=lambda e: close_dialog(invalid_input_dialog))
-            ],
-            icon=ft.Icon(ft.Icons.INFO, color=ft.Colors.BLUE)
-        )
-        
-        database_error_dialog = ft.AlertDialog(
-            title=ft.Text("Database Error"),
-            content=ft.Text(
-                "An error occurred while connecting to the database",
-                text_align=ft.TextAlign.CENTER
-            ),
-            actions=[
-                ft.TextButton("OK", on_click=lambda e: close_dialog(database_error_dialog))
-            ],
-            icon=ft.Icon(ft.Icons.ERROR, color=ft.Colors.RED)
+    
+    auth_service = get_auth_service()
+    sessions = get_session_signer()
+    # The login attempt in flight, if any; clicking the button again cancels it
+    pending_login = None
+    
+    def close_dialog(dialog):
+        dialog.open = False
+        page.update()
+    
+    def make_dialog(title, icon, color):
+        dialog = ft.AlertDialog(
+            title=ft.Text(title),
+            content=ft.Text("", text_align=ft.TextAlign.CENTER),
+            icon=ft.Icon(icon, color=color)
         )
-        
-        def close_dialog(dialog):
-            dialog.open = False
-            page.update()
+        dialog.actions = [ft.TextButton("OK", on_click=lambda e: close_dialog(dialog))]
+        return dialog
+    
+    # Built once and kept in the overlay for the page's lifetime; each login only fills in the text and opens one
+    success_dialog = make_dialog("Login Successful", ft.Icons.CHECK_CIRCLE, ft.Colors.GREEN)
+    failure_dialog = make_dialog("Login Failed", ft.Icons.ERROR, ft.Colors.RED)
+    rate_limited_dialog = make_dialog("Too Many Attempts", ft.Icons.TIMER, ft.Colors.ORANGE)
+    invalid_input_dialog = make_dialog("Input Error", ft.Icons.INFO, ft.Colors.BLUE)
+    database_error_dialog = make_dialog("Database Error", ft.Icons.ERROR, ft.Colors.RED)
+    
+    def show_dialog(dialog, message):
+        dialog.content.value = message
+        dialog.open = True
+    
+    async def login_click(e):
+        nonlocal pending_login
+        if pending_login is not None and not pending_login.done():
+            pending_login.cancel()
+            return
         
         if not username_input.value or not password.value:
-            page.overlay.append(invalid_input_dialog)
-            invalid_input_dialog.open = True
+            show_dialog(invalid_input_dialog, "Please enter username and password")
             page.update()
             return
         
+        # The name that was checked is the one signed in, whatever the field holds by the time the check ends
+        username = username_input.value
+        
+        # Runs on the auth service's worker threads; the window stays responsive meanwhile
+        pending_login = asyncio.ensure_future(
+            auth_service.authenticate(username, password.value, client=page.client_ip or page.session_id)
+        )
+        username_input.disabled = True
+        password.disabled = True
+        login_button.text = "Cancel"
+        login_button.icon = ft.Icons.CLOSE
+        page.update()
+        
         try:
-            conn = connect_db()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT * FROM users WHERE username = %s AND password = %s",
-                (username_input.value, password.value)
-            )
-            
-            result = cursor.fetchone()
-            conn.close()
+            result = await pending_login
             
             if result:
-                page.overlay.append(success_dialog)
-                success_dialog.open = True
+                # Remembered for next launch, which then skips the database entirely
+                page.client_storage.set(STORAGE_KEY, sessions.issue(username))
+                show_dialog(success_dialog, f"Welcome, {username}!")
             else:
-                page.overlay.append(failure_dialog)
-                failure_dialog.open = True
-            
-            page.update()
-            
-        except mysql.connector.Error as e:
-            page.overlay.append(database_error_dialog)
-            database_error_dialog.open = True
-            page.update()
+                show_dialog(failure_dialog, "Invalid username or password")
+        
+        except asyncio.CancelledError:
+            # Cancelled from the button; nothing to report
+            pass
+        
+        except AuthRateLimited as e:
+            show_dialog(rate_limited_dialog, f"Please wait {max(1, round(e.retry_after))} seconds before trying again.")
+            print(f"Login rate limited: {e}")
+        
+        except AuthTimeout as e:
+            show_dialog(database_error_dialog, "The database took too long to respond. Please try again.")
+            print(f"Database timeout: {e}")
+        
+        except AuthError as e:
+            show_dialog(database_error_dialog, "An error occurred while connecting to the database")
             print(f"Database error: {e}")
-
+        
+        finally:
+            pending_login = None
+            username_input.disabled = False
+            password.disabled = False
+            login_button.text = "Login"
+            login_button.icon = ft.Icons.LOGIN
+            page.update()
+    
     login_button = ft.ElevatedButton(
         text="Login",
         on_click=login_click,
@@ -135,6 +137,31 @@ def main(page: ft.Page):
         icon=ft.Icons.LOGIN
     )
     
+    def sign_out(e):
+        page.client_storage.remove(STORAGE_KEY)
+        welcome_back_dialog.open = False
+        password.value = ""
+        page.update()
+    
+    welcome_back_dialog = ft.AlertDialog(
+        title=ft.Text("Welcome Back"),
+        content=ft.Text("", text_align=ft.TextAlign.CENTER),
+        actions=[
+            ft.TextButton("Sign out", on_click=sign_out),
+            ft.TextButton("OK", on_click=lambda e: close_dialog(welcome_back_dialog))
+        ],
+        icon=ft.Icon(ft.Icons.CHECK_CIRCLE, color=ft.Colors.GREEN)
+    )
+    
+    page.overlay.extend([
+        success_dialog,
+        failure_dialog,
+        rate_limited_dialog,
+        invalid_input_dialog,
+        database_error_dialog,
+        welcome_back_dialog
+    ])
+    
     page.add(
         ft.Column([
             log_in_title,
@@ -150,5 +177,13 @@ def main(page: ft.Page):
         ], 
         horizontal_alignment=ft.CrossAxisAlignment.CENTER)
     )
+    
+    # A valid stored token logs the user straight in, with no password check or database query
+    remembered = sessions.validate(page.client_storage.get(STORAGE_KEY))
+    if remembered is not None:
+        username_input.value = remembered
+        show_dialog(welcome_back_dialog, f"Signed in as {remembered}.")
+        page.update()
 
-ft.app(target=main)
\ No newline at end of file
+if __name__ == "__main__":
+    ft.app(target=main)
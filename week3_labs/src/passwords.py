@@ -0,0 +1,113 @@
+import base64
+import hashlib
+import hmac
+import os
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+    _ARGON2_ERRORS = (InvalidHashError, VerificationError)
+except ImportError:
+    PasswordHasher = None
+    _ARGON2_ERRORS = ()
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+BCRYPT_ROUNDS = 12
+# scrypt cost: N = 2**SCRYPT_LN, about 16 MB and tens of milliseconds per hash
+SCRYPT_LN = 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_SALT_BYTES = 16
+SCRYPT_KEY_BYTES = 32
+
+_argon2 = PasswordHasher() if PasswordHasher else None
+
+
+def preferred_scheme():
+    """The scheme new hashes use: argon2 or bcrypt when installed, else scrypt from the standard library."""
+    if _argon2 is not None:
+        return "argon2"
+    if bcrypt is not None:
+        return "bcrypt"
+    return "scrypt"
+
+
+def _scheme(stored):
+    if stored.startswith("$argon2"):
+        return "argon2"
+    if stored.startswith(("$2a$", "$2b$", "$2y$")):
+        return "bcrypt"
+    if stored.startswith("$scrypt$"):
+        return "scrypt"
+    return None
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, ln, r, p):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=2 ** ln, r=r, p=p,
+                          maxmem=256 * 1024 * 1024, dklen=SCRYPT_KEY_BYTES)
+
+
+def _parse_scrypt(stored):
+    _, _, params, salt, key = stored.split("$")
+    values = dict(item.split("=") for item in params.split(","))
+    return int(values["ln"]), int(values["r"]), int(values["p"]), _unb64(salt), _unb64(key)
+
+
+def hash_password(password):
+    """Hashes password with the preferred scheme into a self-describing string.
+
+    Deliberately slow; call it from a worker thread, not the event loop.
+    """
+    scheme = preferred_scheme()
+    if scheme == "argon2":
+        return _argon2.hash(password)
+    if scheme == "bcrypt":
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(BCRYPT_ROUNDS)).decode("ascii")
+    salt = os.urandom(SCRYPT_SALT_BYTES)
+    key = _scrypt(password, salt, SCRYPT_LN, SCRYPT_R, SCRYPT_P)
+    return f"$scrypt$ln={SCRYPT_LN},r={SCRYPT_R},p={SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+
+def verify_password(password, stored):
+    """True if password matches the stored hash; False for a mismatch or an unreadable hash.
+
+    Deliberately slow; call it from a worker thread, not the event loop.
+    """
+    scheme = _scheme(stored or "")
+    try:
+        if scheme == "argon2" and _argon2 is not None:
+            return _argon2.verify(stored, password)
+        if scheme == "bcrypt" and bcrypt is not None:
+            return bcrypt.checkpw(password.encode("utf-8"), stored.encode("ascii"))
+        if scheme == "scrypt":
+            ln, r, p, salt, key = _parse_scrypt(stored)
+            return hmac.compare_digest(_scrypt(password, salt, ln, r, p), key)
+    except (ValueError, KeyError, *_ARGON2_ERRORS):
+        return False
+    # Hashed with a scheme whose library is not installed here
+    return False
+
+
+def needs_rehash(stored):
+    """True if stored was made with another scheme or weaker settings than hash_password now uses."""
+    scheme = _scheme(stored or "")
+    if scheme != preferred_scheme():
+        return True
+    if scheme == "argon2":
+        return _argon2.check_needs_rehash(stored)
+    if scheme == "bcrypt":
+        return int(stored.split("$")[2]) < BCRYPT_ROUNDS
+    ln, r, p, _, _ = _parse_scrypt(stored)
+    return (ln, r, p) < (SCRYPT_LN, SCRYPT_R, SCRYPT_P)
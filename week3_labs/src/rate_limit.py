@@ -0,0 +1,159 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+USER_ATTEMPTS = 5            # login attempts per username per window
+CLIENT_ATTEMPTS = 20         # login attempts per client per window
+ATTEMPT_WINDOW = 60.0        # seconds
+FAILURE_CACHE_TTL = 30.0     # seconds a failed username/password pair is answered from memory
+FAILURE_CACHE_SIZE = 10000
+MAX_TRACKED_KEYS = 10000     # per limiter; the idlest keys are dropped beyond this
+
+
+class SlidingWindowLimiter:
+    """Allows at most limit events per key in any window-second span."""
+
+    def __init__(self, limit, window, max_keys=MAX_TRACKED_KEYS, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> timestamps of its events, oldest first; the dict is ordered by last event
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, events, now):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def retry_after(self, key):
+        """Seconds until key may act again; 0 if it may act now."""
+        now = self._clock()
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                return 0
+            self._expire(events, now)
+            if len(events) < self.limit:
+                return 0
+            return events[0] + self.window - now
+
+    def hit(self, key):
+        """Records an event for key."""
+        now = self._clock()
+        with self._lock:
+            events = self._events.pop(key, None) or deque()
+            self._expire(events, now)
+            events.append(now)
+            self._events[key] = events
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+
+class FailureCache:
+    """Recently failed (username, password) pairs, expiring after ttl seconds.
+
+    Passwords are kept only as keyed digests; the key is random per process.
+    """
+
+    def __init__(self, ttl=FAILURE_CACHE_TTL, max_entries=FAILURE_CACHE_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._key = os.urandom(32)
+        # (username, digest) -> expiry, oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username, password):
+        return username, hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest()
+
+    def add(self, username, password):
+        key = self._digest(username, password)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = self._clock() + self.ttl
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, credentials):
+        key = self._digest(*credentials)
+        now = self._clock()
+        with self._lock:
+            # Entries share one ttl, so expired ones are all at the front
+            while self._entries and next(iter(self._entries.values())) <= now:
+                self._entries.popitem(last=False)
+            return key in self._entries
+
+    def discard_user(self, username):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == username]:
+                del self._entries[key]
+
+
+class LoginGuard:
+    """Turns away login attempts in memory before they reach the database.
+
+    An attempt is rejected if its username or client has used up its attempt
+    window, or if the same username and password failed within the last few
+    seconds. Only attempts that are let through count against the windows.
+    """
+
+    def __init__(self, user_attempts=USER_ATTEMPTS, client_attempts=CLIENT_ATTEMPTS, window=ATTEMPT_WINDOW,
+                 failure_ttl=FAILURE_CACHE_TTL, clock=time.monotonic):
+        self.users = SlidingWindowLimiter(user_attempts, window, clock=clock)
+        self.clients = SlidingWindowLimiter(client_attempts, window, clock=clock)
+        self.failures = FailureCache(failure_ttl, clock=clock)
+        self._lock = threading.Lock()
+        self._counts = {"forwarded": 0, "rate_limited": 0, "cached_failure": 0}
+
+    def _count(self, outcome):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def check(self, username, password, client=None):
+        """Decides whether an attempt may go to the database.
+
+        Returns "forwarded" (and records the attempt), "cached_failure" if the
+        pair is known to be wrong, or "rate_limited".
+        """
+        if (username, password) in self.failures:
+            outcome = "cached_failure"
+        elif self.retry_after(username, client) > 0:
+            outcome = "rate_limited"
+        else:
+            outcome = "forwarded"
+            self.users.hit(username)
+            if client is not None:
+                self.clients.hit(client)
+        self._count(outcome)
+        return outcome
+
+    def retry_after(self, username, client=None):
+        """Seconds until username (from client) may try again; 0 if it may now."""
+        wait = self.users.retry_after(username)
+        if client is not None:
+            wait = max(wait, self.clients.retry_after(client))
+        return wait
+
+    def record_failure(self, username, password):
+        self.failures.add(username, password)
+
+    def record_success(self, username):
+        """Gives the username a fresh window, so a user who got in is not locked out by earlier typos."""
+        self.users.reset(username)
+        self.failures.discard_user(username)
+
+    def stats(self):
+        """Attempt counts by outcome since start: forwarded, rate_limited, cached_failure, and rejected in total."""
+        with self._lock:
+            counts = dict(self._counts)
+        counts["rejected"] = counts["rate_limited"] + counts["cached_failure"]
+        return counts
@@ -0,0 +1,110 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+SESSION_TTL = 7 * 24 * 3600              # seconds a remembered login stays valid
+SESSION_SECRET_ENV = "USERLOGIN_SESSION_SECRET"
+SESSION_KEY_FILE = "session.key"         # created on first use when the environment sets no secret
+MIN_SECRET_BYTES = 32                    # shorter secrets are refused rather than signed with
+STORAGE_KEY = "userlogin.session"        # client_storage key holding the token
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _checked(secret, source, remedy):
+    if len(secret) < MIN_SECRET_BYTES:
+        raise ValueError(f"The session secret in {source} is shorter than {MIN_SECRET_BYTES} bytes; {remedy}")
+    return secret
+
+
+def load_secret(path=SESSION_KEY_FILE):
+    """The signing secret: from the environment, else from the key file, which is created if missing.
+
+    Raises ValueError for a secret shorter than MIN_SECRET_BYTES, e.g. an
+    empty key file, since tokens signed with it could be forged.
+    """
+    secret = os.environ.get(SESSION_SECRET_ENV)
+    if secret:
+        return _checked(secret.encode("utf-8"), SESSION_SECRET_ENV, "set a longer one")
+    try:
+        with open(path, "rb") as f:
+            return _checked(f.read(), path, f"delete {path} to have a new one generated")
+    except FileNotFoundError:
+        pass
+    # Written in full to a temporary file (readable by the owner only) and renamed into place,
+    # so a crash never leaves a short or empty key file behind
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".session-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_bytes(MIN_SECRET_BYTES))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    # Read back, so a process that raced this one to create the file ends up with the same key
+    with open(path, "rb") as f:
+        return _checked(f.read(), path, f"delete {path} to have a new one generated")
+
+
+class SessionSigner:
+    """Issues and checks signed, expiring session tokens.
+
+    A token is the username and expiry time plus an HMAC over them, so
+    checking one needs no database round trip. Tokens stop working when they
+    expire or when the secret changes.
+    """
+
+    def __init__(self, secret=None, ttl=SESSION_TTL, clock=time.time):
+        self._secret = secret if secret is not None else load_secret()
+        self.ttl = ttl
+        self._clock = clock
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self._secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, username):
+        """A token for username, valid for ttl seconds."""
+        claims = {"u": username, "exp": int(self._clock() + self.ttl)}
+        payload = _b64(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{self._sign(payload)}"
+
+    def validate(self, token):
+        """The username the token was issued for, or None if it is forged, malformed or expired."""
+        try:
+            payload, signature = token.split(".")
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            claims = json.loads(_unb64(payload))
+            if claims["exp"] <= self._clock():
+                return None
+            return claims["u"]
+        except (AttributeError, ValueError, KeyError, TypeError):
+            return None
+
+
+_signer = None
+_signer_lock = threading.Lock()
+
+
+def get_session_signer():
+    """The process-wide session signer, created (and the key file with it) on first use."""
+    global _signer
+    with _signer_lock:
+        if _signer is None:
+            _signer = SessionSigner()
+        return _signer
@@ -0,0 +1,211 @@
+# bench_contacts.py
+"""Contact book benchmarks against seeded synthetic databases.
+
+Usage (from contact_book_app/):
+
+    python benchmarks/bench_contacts.py                       # 1k, 100k, 1M
+    python benchmarks/bench_contacts.py --sizes 1000 100000 --output results.json
+
+Databases are generated once per (size, seed) into --data-dir and reused.
+Results are written as JSON so runs can be diffed in review.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from database import (init_db, add_contact_db, update_contact_db, delete_contact_db, get_all_contacts_db,  # noqa: E402
+                      get_initial_counts_db)
+from import_export import import_rows  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_SEED = 106
+SEARCH_QUERIES = 200
+WRITE_OPS = 500
+
+SYLLABLES = ["an", "be", "ca", "de", "el", "fi", "go", "ha", "is", "jo", "ka", "li",
+             "ma", "ne", "ol", "pa", "qu", "ri", "sa", "te", "ur", "vi", "wa", "xe", "yo", "za"]
+
+
+def make_name(rng):
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+    return f"{first} {last}"
+
+
+def make_contact(rng):
+    name = make_name(rng)
+    phone = f"09{rng.randint(100000000, 999999999)}" if rng.random() < 0.9 else ""
+    email = f"{name.replace(' ', '.').lower()}{rng.randint(1, 999)}@example.com" if rng.random() < 0.8 else ""
+    return (name, phone, email)
+
+
+def build_dataset(path, size, seed):
+    """Creates a database with size seeded contacts unless it already exists."""
+    if os.path.exists(path):
+        return
+    rng = random.Random(seed)
+    pool = init_db(path)
+    # Goes through the bulk importer so the search index and normalized columns are filled in
+    import_rows(pool, ((i, *make_contact(rng)) for i in range(size)), batch_size=10_000)
+    pool.close()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p95_ms": pick(0.95) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def bench_search(pool, rng):
+    terms = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 2))) for _ in range(SEARCH_QUERIES)]
+    samples = []
+    for term in terms:
+        start = time.perf_counter()
+        get_all_contacts_db(pool, term)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    get_all_contacts_db(pool)
+    full_list = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_initial_counts_db(pool)
+    initial_counts = time.perf_counter() - start
+    return {"search": percentiles(samples), "full_list_ms": full_list * 1000, "initial_counts_ms": initial_counts * 1000}
+
+
+def bench_writes(pool, rng):
+    def throughput(fn, args_list):
+        start = time.perf_counter()
+        results = [fn(pool, *args) for args in args_list]
+        elapsed = time.perf_counter() - start
+        return results, {"ops": len(args_list), "seconds": elapsed, "ops_per_sec": len(args_list) / elapsed}
+
+    inserted, insert_stats = throughput(add_contact_db, [make_contact(rng) for _ in range(WRITE_OPS)])
+    ids = [row[0] for row in inserted]
+    _, update_stats = throughput(update_contact_db, [(cid, *make_contact(rng)) for cid in ids])
+    _, delete_stats = throughput(delete_contact_db, [(cid,) for cid in ids])
+    return {"insert": insert_stats, "update": update_stats, "delete": delete_stats}
+
+
+class FakePage:
+    """Just enough of ft.Page for display_contacts: counts update() calls."""
+
+    def __init__(self):
+        self.updates = 0
+        self.overlay = []
+
+    def update(self, *controls):
+        self.updates += 1
+
+    def open(self, control):
+        pass
+
+    def close(self, control):
+        pass
+
+
+def bench_display(pool):
+    import flet as ft
+    from async_db import AsyncContactDB
+    from app_logic import ALPHABET, display_contacts, jump_to_initial
+
+    async def run():
+        db = AsyncContactDB(pool)
+        contacts_list_view = ft.ListView()
+        page = FakePage()
+        # The in-memory index is loaded on first use; timed on its own, as it is what grows with the book
+        start = time.perf_counter()
+        await db.run(db.contacts.reload)
+        index_load = time.perf_counter() - start
+        start = time.perf_counter()
+        await display_contacts(page, contacts_list_view, db)
+        elapsed = time.perf_counter() - start
+        # A second pass rebinds the existing cards instead of building new ones
+        start = time.perf_counter()
+        await display_contacts(page, contacts_list_view, db)
+        refresh = time.perf_counter() - start
+        cards = len(contacts_list_view.data["keys"])
+        jumps = []
+        for letter in ALPHABET:
+            start = time.perf_counter()
+            await jump_to_initial(page, contacts_list_view, db, letter)
+            jumps.append(time.perf_counter() - start)
+        db.close()  # also closes the pool, so this runs last
+        return {"index_load_seconds": index_load, "seconds": elapsed, "refresh_seconds": refresh, "cards": cards,
+                "us_per_card": elapsed / max(1, cards) * 1e6, "jump": percentiles(jumps)}
+
+    return asyncio.run(run())
+
+
+def run_size(data_dir, size, seed):
+    path = os.path.join(data_dir, f"contacts_{size}_{seed}.db")
+    start = time.perf_counter()
+    build_dataset(path, size, seed)
+    build_seconds = time.perf_counter() - start
+
+    pool = init_db(path)
+    rng = random.Random(seed + 1)
+    try:
+        result = {"size": size, "dataset_build_seconds": build_seconds}
+        result.update(bench_search(pool, rng))
+        result["writes"] = bench_writes(pool, rng)
+        result["display"] = bench_display(pool)
+    finally:
+        pool.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the contact book at scale.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "contact_book_bench"))
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": [],
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} contacts...")
+        result = run_size(args.data_dir, size, args.seed)
+        report["results"].append(result)
+        print(f"  search p50 {result['search']['p50_ms']:.2f} ms, p95 {result['search']['p95_ms']:.2f} ms; "
+              f"insert {result['writes']['insert']['ops_per_sec']:.0f} ops/s; "
+              f"index load {result['display']['index_load_seconds']:.2f} s")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
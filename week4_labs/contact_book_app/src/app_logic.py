@@ -1,71 +1,520 @@
 # app_logic.py
+import asyncio
+import logging
+import sqlite3
+from bisect import bisect_left
+
 import flet as ft
-from database import update_contact_db, delete_contact_db, add_contact_db, get_all_contacts_db
 
-def display_contacts(page, contacts_list_view, db_conn, search_term=None):
-    """Fetches and displays all contacts in the ListView."""
-    contacts_list_view.controls.clear()
-    contacts = get_all_contacts_db(db_conn, search_term)
+from avatars import AvatarError
+from database import UndoConflict
+from db_pool import PoolTimeout
+from repository import sort_key
+
+logger = logging.getLogger(__name__)
+
+def _list_state(contacts_list_view):
+    """Returns the id->card map and sorted keys kept on the ListView.
     
-    if not contacts:
-        contacts_list_view.controls.append(
+    keys[i] is the sort_key of the i-th card; each card stores its own key in card.data.
+    generation increases with every display_contacts call so late query results can be dropped.
+    ranked is True while the list shows fuzzy matches in relevance order rather than sorted by name.
+    selected holds the ids ticked for bulk actions; selection_bar is the bar that acts on them.
+    card_pool holds detached ContactCards for reuse; action_sheet is the shared Edit/Delete sheet.
+    The list shows a window of the results: more_before/more_after say whether rows exist
+    outside it, and loading is set while a page is being fetched. controls[0] is always a
+    lead control (the fuzzy header, or earlier_button) so card i sits at controls[i + 1].
+    alphabet_bar is the A-Z jump bar. viewport is (scroll offset, viewport height, average
+    control height) from the last scroll event, used to tell which cards are on screen.
+    photo_picker is the FilePicker used to choose contact photos.
+    """
+    if contacts_list_view.data is None:
+        contacts_list_view.data = {"cards": {}, "keys": [], "search_term": None, "generation": 0, "ranked": False,
+                                   "selected": set(), "selection_bar": None, "card_pool": [], "action_sheet": None,
+                                   "more_before": False, "more_after": False, "loading": False,
+                                   "earlier_button": None, "alphabet_bar": None, "viewport": None,
+                                   "photo_picker": None}
+    return contacts_list_view.data
+
+# Change sets larger than this redraw the list instead of patching card by card
+MAX_INCREMENTAL_CHANGES = 1000
+
+def _matches_search(name, search_term):
+    """Mirrors the case-insensitive LIKE filter used by get_all_contacts_db."""
+    return not search_term or search_term.lower() in name.lower()
+
+def _empty_placeholder():
+    return ft.Container(
+        content=ft.Text("No contacts found", style=ft.TextThemeStyle.BODY_MEDIUM),
+        alignment=ft.alignment.center,
+        padding=20
+    )
+
+class ContactCard(ft.Card):
+    """A contact card whose controls are built once and rebound to other contacts.
+    
+    Handlers are bound methods that read the current contact at event time,
+    so rebinding allocates nothing and only changed properties reach the client.
+    """
+    
+    def __init__(self, page, contacts_list_view, db):
+        self.page_ref = page
+        self.contacts_list_view = contacts_list_view
+        self.db = db
+        self.contact = None
+        # True while the card shows initials for a contact whose photo has not been fetched yet
+        self.avatar_pending = False
+        
+        self.checkbox = ft.Checkbox(on_change=self._on_check)
+        self.initials_text = ft.Text(weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE)
+        self.avatar_image = ft.DecorationImage(fit=ft.ImageFit.COVER)
+        self.avatar = ft.Container(
+            content=self.initials_text,
+            width=40,
+            height=40,
+            shape=ft.BoxShape.CIRCLE,
+            bgcolor=ft.Colors.BLUE_GREY_400,
+            alignment=ft.alignment.center
+        )
+        self.name_text = ft.Text(size=16, weight=ft.FontWeight.BOLD)
+        self.phone_text = ft.Text(size=14)
+        self.email_text = ft.Text(size=14)
+        self.phone_row = ft.Row([ft.Icon(ft.Icons.PHONE, size=16), self.phone_text], spacing=5)
+        self.email_row = ft.Row([ft.Icon(ft.Icons.EMAIL, size=16), self.email_text], spacing=5)
+        
+        super().__init__(
+            content=ft.Container(
+                content=ft.Row([
+                    self.checkbox,
+                    self.avatar,
+                    ft.Column([self.name_text, self.phone_row, self.email_row], spacing=5, expand=True),
+                    ft.IconButton(icon=ft.Icons.MORE_VERT, on_click=self._on_menu),
+                ]),
+                padding=15
+            ),
+            elevation=2
+        )
+    
+    def bind(self, contact, selected=False):
+        """Shows contact on this card."""
+        contact_id, name, phone, email = contact
+        self.contact = contact
+        self.data = sort_key(name, contact_id)
+        self.checkbox.value = selected
+        self.name_text.value = name
+        self.phone_text.value = phone
+        self.phone_row.visible = bool(phone)
+        self.email_text.value = email
+        self.email_row.visible = bool(email)
+        self.initials_text.value = _initials(name)
+        # Only a thumbnail already in memory is shown here; decoding waits until the card is on screen
+        thumbnail = self.db.avatars.cached(contact_id)
+        self.show_thumbnail(thumbnail)
+        self.avatar_pending = thumbnail is None and self.db.avatars.version(contact_id) is not None
+    
+    def show_thumbnail(self, thumbnail):
+        """Shows a base64 photo thumbnail, or the initials when thumbnail is None."""
+        self.avatar_image.src_base64 = thumbnail
+        self.avatar.image = self.avatar_image if thumbnail else None
+        self.initials_text.visible = not thumbnail
+    
+    def _on_check(self, e):
+        toggle_selection(self.page_ref, self.contacts_list_view, self.contact[0], e.control.value)
+    
+    def _on_menu(self, e):
+        open_contact_actions(self.page_ref, self.contacts_list_view, self.db, self.contact)
+
+def _initials(name):
+    return "".join(word[0] for word in name.split()[:2]).upper()
+
+# Spare cards kept per list for reuse
+MAX_POOLED_CARDS = 500
+
+def _acquire_card(page, contacts_list_view, db, contact):
+    state = _list_state(contacts_list_view)
+    card = state["card_pool"].pop() if state["card_pool"] else ContactCard(page, contacts_list_view, db)
+    card.bind(contact, contact[0] in state["selected"])
+    return card
+
+def _release_card(state, card):
+    card.contact = None
+    if len(state["card_pool"]) < MAX_POOLED_CARDS:
+        state["card_pool"].append(card)
+
+def _photo_picker(page, contacts_list_view, db):
+    state = _list_state(contacts_list_view)
+    picker = state["photo_picker"]
+    if picker is None:
+        async def on_result(e):
+            if e.files:
+                await set_contact_photo(page, contacts_list_view, db, picker.data, e.files[0].path)
+        
+        picker = ft.FilePicker(on_result=on_result)
+        page.overlay.append(picker)
+        page.update()
+        state["photo_picker"] = picker
+    return picker
+
+def open_contact_actions(page, contacts_list_view, db, contact):
+    """Opens the Edit/Delete/photo sheet for a contact.
+    
+    One sheet is shared by every card and only built the first time it is opened.
+    """
+    state = _list_state(contacts_list_view)
+    sheet = state["action_sheet"]
+    if sheet is None:
+        def on_edit(e):
+            page.close(sheet)
+            open_edit_dialog(page, sheet.data, db, contacts_list_view)
+        
+        def on_delete(e):
+            page.close(sheet)
+            show_delete_confirmation(page, sheet.data[0], sheet.data[1], db, contacts_list_view)
+        
+        def on_set_photo(e):
+            page.close(sheet)
+            picker = _photo_picker(page, contacts_list_view, db)
+            picker.data = sheet.data
+            picker.pick_files(allowed_extensions=["jpg", "jpeg", "png", "gif", "webp"])
+        
+        async def on_remove_photo(e):
+            page.close(sheet)
+            await remove_contact_photo(page, contacts_list_view, db, sheet.data)
+        
+        sheet = ft.BottomSheet(
             ft.Container(
-                content=ft.Text("No contacts found", style=ft.TextThemeStyle.BODY_MEDIUM),
-                alignment=ft.alignment.center,
-                padding=20
+                ft.Column([
+                    ft.Text("", size=16, weight=ft.FontWeight.BOLD),
+                    ft.ListTile(leading=ft.Icon(ft.Icons.EDIT), title=ft.Text("Edit"), on_click=on_edit),
+                    ft.ListTile(leading=ft.Icon(ft.Icons.PHOTO), title=ft.Text("Set photo"), on_click=on_set_photo),
+                    ft.ListTile(leading=ft.Icon(ft.Icons.HIDE_IMAGE), title=ft.Text("Remove photo"),
+                                on_click=on_remove_photo),
+                    ft.ListTile(leading=ft.Icon(ft.Icons.DELETE), title=ft.Text("Delete"), on_click=on_delete),
+                ], tight=True),
+                padding=15
             )
         )
+        state["action_sheet"] = sheet
+    
+    sheet.data = contact
+    title, _, _, remove_photo_tile, _ = sheet.content.content.controls
+    title.value = contact[1]
+    remove_photo_tile.visible = db.avatars.version(contact[0]) is not None
+    page.open(sheet)
+
+async def set_contact_photo(page, contacts_list_view, db, contact, path):
+    """Stores an image file as the contact's photo and shows it on the contact's card."""
+    try:
+        await db.set_photo(contact[0], path)
+    except (OSError, sqlite3.Error, AvatarError) as e:
+        show_message(page, f"Could not set photo: {e}")
+        page.update()
+        return
+    
+    if not db.avatars.enabled:
+        show_message(page, "Photo saved. Install Pillow to show contact photos.")
     else:
-        for contact in contacts:
-            contact_id, name, phone, email = contact
-            
-            # Create a modern card layout
-            card_content = ft.Column([
-                ft.Text(name, size=16, weight=ft.FontWeight.BOLD),
-                ft.Row([
-                    ft.Icon(ft.Icons.PHONE, size=16),
-                    ft.Text(phone or "No phone", size=14)
-                ], spacing=5) if phone else ft.Container(),
-                ft.Row([
-                    ft.Icon(ft.Icons.EMAIL, size=16),
-                    ft.Text(email or "No email", size=14)
-                ], spacing=5) if email else ft.Container(),
-            ], spacing=5)
-            
-            card = ft.Card(
-                content=ft.Container(
-                    content=ft.Row([
-                        ft.Container(card_content, expand=True),
-                        ft.PopupMenuButton(
-                            icon=ft.Icons.MORE_VERT,
-                            items=[
-                                ft.PopupMenuItem(
-                                    text="Edit",
-                                    icon=ft.Icons.EDIT,
-                                    on_click=lambda _, c=contact: open_edit_dialog(page, c, db_conn, contacts_list_view)
-                                ),
-                                ft.PopupMenuItem(),
-                                ft.PopupMenuItem(
-                                    text="Delete",
-                                    icon=ft.Icons.DELETE,
-                                    on_click=lambda _, cid=contact_id: show_delete_confirmation(page, cid, name, db_conn, contacts_list_view)
-                                ),
-                            ],
-                        ),
-                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                    padding=15
-                ),
-                elevation=2
-            )
-            contacts_list_view.controls.append(card)
+        thumbnail = await db.avatar_thumbnail(contact[0])
+        card = _list_state(contacts_list_view)["cards"].get(contact[0])
+        if card is not None:
+            card.show_thumbnail(thumbnail)
+            card.avatar_pending = False
+    page.update()
+
+async def remove_contact_photo(page, contacts_list_view, db, contact):
+    """Deletes the contact's photo; its card goes back to initials."""
+    await db.remove_photo(contact[0])
+    card = _list_state(contacts_list_view)["cards"].get(contact[0])
+    if card is not None:
+        card.show_thumbnail(None)
+        card.avatar_pending = False
+    page.update()
+
+def _earlier_button(page, contacts_list_view, db):
+    state = _list_state(contacts_list_view)
+    if state["earlier_button"] is None:
+        async def on_click(e):
+            await load_earlier_contacts(page, contacts_list_view, db)
+        
+        state["earlier_button"] = ft.TextButton("Show earlier contacts", icon=ft.Icons.EXPAND_LESS, on_click=on_click)
+    return state["earlier_button"]
+
+def _show_contacts(page, contacts_list_view, db, contacts, lead):
+    """Replaces the displayed window with contacts, rebinding the cards already on screen in order."""
+    state = _list_state(contacts_list_view)
+    old_cards = [control for control in contacts_list_view.controls if isinstance(control, ContactCard)]
+    state["cards"].clear()
+    state["keys"].clear()
+    contacts_list_view.controls.clear()
+    contacts_list_view.controls.append(lead)
+    
+    if not contacts:
+        contacts_list_view.controls.append(_empty_placeholder())
+    for i, contact in enumerate(contacts):
+        if i < len(old_cards):
+            card = old_cards[i]
+            card.bind(contact, contact[0] in state["selected"])
+        else:
+            card = _acquire_card(page, contacts_list_view, db, contact)
+        state["cards"][contact[0]] = card
+        state["keys"].append(sort_key(contact[1], contact[0]))
+        contacts_list_view.controls.append(card)
+    for card in old_cards[len(contacts):]:
+        _release_card(state, card)
+    
+    if contacts_list_view.page is not None:
+        contacts_list_view.scroll_to(offset=0)
+    if state["viewport"] is not None:
+        _, height, average = state["viewport"]
+        state["viewport"] = (0, height, average)
+
+async def display_contacts(page, contacts_list_view, db, search_term=None):
+    """Fetches and displays the first page of contacts in the ListView.
+    
+    Later pages load as the list is scrolled; see load_more_contacts. Runs on
+    every search keystroke, so it leaves the A-Z bar alone: writes and syncs
+    refresh it themselves with refresh_alphabet_bar.
+    """
+    state = _list_state(contacts_list_view)
+    state["generation"] += 1
+    generation = state["generation"]
+    contacts, more_before, more_after = await db.contacts_page(search_term)
+    ranked = False
+    if not contacts and search_term:
+        # No exact matches: fall back to typo-tolerant matches, best first
+        contacts = await db.fuzzy_search(search_term)
+        ranked = bool(contacts)
+    if generation != state["generation"]:
+        # A newer search started while this one was running
+        return
+    
+    state["search_term"] = search_term
+    state["ranked"] = ranked
+    state["more_before"], state["more_after"] = more_before, more_after
+    state["selected"].intersection_update(contact[0] for contact in contacts)
+    _refresh_selection_bar(state)
+    
+    if ranked:
+        lead = ft.Text(f"No exact matches for '{search_term}'. Similar names:", italic=True)
+    else:
+        lead = _earlier_button(page, contacts_list_view, db)
+        lead.visible = more_before
+    _show_contacts(page, contacts_list_view, db, contacts, lead)
     
     page.update()
+    await load_visible_avatars(page, contacts_list_view, db)
+
+async def load_more_contacts(page, contacts_list_view, db):
+    """Appends the next page of contacts after the last card shown."""
+    state = _list_state(contacts_list_view)
+    if state["ranked"] or state["loading"] or not state["more_after"] or not state["keys"]:
+        return
+    generation = state["generation"]
+    state["loading"] = True
+    try:
+        contacts, _, more_after = await db.contacts_page(state["search_term"], after=state["keys"][-1])
+    finally:
+        state["loading"] = False
+    if generation != state["generation"]:
+        return
+    
+    state["more_after"] = more_after
+    for contact in contacts:
+        if contact[0] in state["cards"]:
+            # Inserted incrementally while this page was loading
+            continue
+        card = _acquire_card(page, contacts_list_view, db, contact)
+        state["cards"][contact[0]] = card
+        state["keys"].append(sort_key(contact[1], contact[0]))
+        contacts_list_view.controls.append(card)
+    page.update()
+
+async def load_earlier_contacts(page, contacts_list_view, db):
+    """Prepends the page of contacts before the first card shown."""
+    state = _list_state(contacts_list_view)
+    if state["ranked"] or state["loading"] or not state["more_before"] or not state["keys"]:
+        return
+    generation = state["generation"]
+    state["loading"] = True
+    try:
+        contacts, more_before, _ = await db.contacts_page(state["search_term"], before=state["keys"][0])
+    finally:
+        state["loading"] = False
+    if generation != state["generation"]:
+        return
+    
+    state["more_before"] = more_before
+    _earlier_button(page, contacts_list_view, db).visible = more_before
+    contacts = [contact for contact in contacts if contact[0] not in state["cards"]]
+    cards = [_acquire_card(page, contacts_list_view, db, contact) for contact in contacts]
+    for contact, card in zip(contacts, cards):
+        state["cards"][contact[0]] = card
+    state["keys"][0:0] = [sort_key(contact[1], contact[0]) for contact in contacts]
+    contacts_list_view.controls[1:1] = cards
+    page.update()
+    await load_visible_avatars(page, contacts_list_view, db)
+
+# Start loading the next page when the list is scrolled this close to its end
+LOAD_MORE_EXTENT = 600
+
+async def handle_list_scroll(page, e, contacts_list_view, db):
+    """Loads the next page once the list is scrolled near its end, and photos for the cards in view."""
+    if e.max_scroll_extent is None:
+        return
+    state = _list_state(contacts_list_view)
+    content_height = e.max_scroll_extent + e.viewport_dimension
+    state["viewport"] = (e.pixels, e.viewport_dimension, content_height / max(1, len(contacts_list_view.controls)))
+    if e.pixels >= e.max_scroll_extent - LOAD_MORE_EXTENT:
+        await load_more_contacts(page, contacts_list_view, db)
+    await load_visible_avatars(page, contacts_list_view, db)
+
+# Cards assumed to be on screen before a scroll event has reported the viewport
+AVATAR_PRELOAD_CARDS = 12
+
+def _visible_cards(contacts_list_view):
+    """The cards estimated to be on screen, padded by a card either side."""
+    state = _list_state(contacts_list_view)
+    cards = contacts_list_view.controls[1:1 + len(state["keys"])]
+    if state["viewport"] is None:
+        return cards[:AVATAR_PRELOAD_CARDS]
+    pixels, height, average = state["viewport"]
+    # controls[0] is the lead control, so control i is card i - 1
+    first = max(0, int(pixels / average) - 2)
+    last = int((pixels + height) / average) + 1
+    return cards[first:last]
+
+async def load_visible_avatars(page, contacts_list_view, db):
+    """Fetches photo thumbnails for the cards on screen that still show initials."""
+    cards = [card for card in _visible_cards(contacts_list_view) if card.avatar_pending]
+    if not cards:
+        return
+    contacts = [card.contact for card in cards]
+    for card in cards:
+        card.avatar_pending = False
+    thumbnails = await asyncio.gather(*(db.avatar_thumbnail(contact[0]) for contact in contacts),
+                                      return_exceptions=True)
+    for card, contact, thumbnail in zip(cards, contacts, thumbnails):
+        if isinstance(thumbnail, Exception):
+            logger.warning("thumbnail for contact %s failed: %s", contact[0], thumbnail)
+        elif thumbnail and card.contact is contact:
+            # Skipped if the card was rebound while the thumbnail loaded
+            card.show_thumbnail(thumbnail)
+    page.update()
+
+async def jump_to_initial(page, contacts_list_view, db, initial):
+    """Shows the window of contacts starting at the first name at or past initial, in either case ("#" jumps to the top)."""
+    state = _list_state(contacts_list_view)
+    if state["ranked"]:
+        return
+    state["generation"] += 1
+    generation = state["generation"]
+    after = None if initial == "#" else sort_key(initial, -1)
+    contacts, more_before, more_after = await db.contacts_page(state["search_term"], after=after)
+    if generation != state["generation"]:
+        return
+    if not contacts:
+        show_message(page, f"No contacts from {initial} on")
+        page.update()
+        return
+    
+    state["more_before"], state["more_after"] = more_before, more_after
+    lead = _earlier_button(page, contacts_list_view, db)
+    lead.visible = more_before
+    _show_contacts(page, contacts_list_view, db, contacts, lead)
+    page.update()
+    await load_visible_avatars(page, contacts_list_view, db)
+
+def _in_window(state, key):
+    """Whether key sorts inside the loaded window, so its card belongs on screen."""
+    keys = state["keys"]
+    if not keys and (state["more_before"] or state["more_after"]):
+        # An emptied window has no bounds left to compare with; leave the contact to paging
+        return False
+    if keys and state["more_before"] and key < keys[0]:
+        return False
+    if keys and state["more_after"] and key > keys[-1]:
+        return False
+    return True
+
+def insert_contact_card(page, contacts_list_view, db, contact):
+    """Inserts the card for a new contact at its sorted position, if it matches the current search.
+    
+    Contacts that sort outside the loaded window are left for paging to pick up.
+    """
+    state = _list_state(contacts_list_view)
+    contact_id, name = contact[0], contact[1]
+    key = sort_key(name, contact_id)
+    if state["ranked"] or not _matches_search(name, state["search_term"]) or not _in_window(state, key):
+        return
+    
+    if not state["keys"]:
+        # Drop the "No contacts found" placeholder
+        del contacts_list_view.controls[1:]
+    
+    index = bisect_left(state["keys"], key)
+    card = _acquire_card(page, contacts_list_view, db, contact)
+    state["keys"].insert(index, key)
+    state["cards"][contact_id] = card
+    contacts_list_view.controls.insert(index + 1, card)
+
+def remove_contact_card(page, contacts_list_view, contact_id):
+    """Removes the card for a contact, if it is currently displayed."""
+    state = _list_state(contacts_list_view)
+    card = state["cards"].pop(contact_id, None)
+    if card is None:
+        return
+    if contact_id in state["selected"]:
+        state["selected"].discard(contact_id)
+        _refresh_selection_bar(state)
+    
+    if state["ranked"]:
+        state["keys"].remove(card.data)
+        contacts_list_view.controls.remove(card)
+    else:
+        index = bisect_left(state["keys"], card.data)
+        del state["keys"][index]
+        del contacts_list_view.controls[index + 1]
+    _release_card(state, card)
+    
+    if not state["keys"]:
+        contacts_list_view.controls.append(_empty_placeholder())
+
+def replace_contact_card(page, contacts_list_view, db, contact):
+    """Rebinds the card for an edited contact, moving it if its sort position changed."""
+    state = _list_state(contacts_list_view)
+    contact_id, name = contact[0], contact[1]
+    card = state["cards"].get(contact_id)
+    
+    if card is not None and state["ranked"]:
+        # Ranked lists keep their order; update the card where it is
+        state["keys"][state["keys"].index(card.data)] = sort_key(name, contact_id)
+        card.bind(contact, contact_id in state["selected"])
+        return
+    
+    if card is not None and card.data == sort_key(name, contact_id) and _matches_search(name, state["search_term"]):
+        # Same sort position, rebind the card in place
+        card.bind(contact, contact_id in state["selected"])
+        return
+    
+    remove_contact_card(page, contacts_list_view, contact_id)
+    insert_contact_card(page, contacts_list_view, db, contact)
+
+def apply_contact_changes(page, contacts_list_view, db, changed_rows, deleted_ids):
+    """Patches the displayed cards for rows changed and ids deleted by a bulk operation."""
+    state = _list_state(contacts_list_view)
+    for contact_id in deleted_ids:
+        remove_contact_card(page, contacts_list_view, contact_id)
+    for contact in changed_rows:
+        if contact[0] in state["cards"]:
+            replace_contact_card(page, contacts_list_view, db, contact)
+        else:
+            insert_contact_card(page, contacts_list_view, db, contact)
 
-def search_contacts(page, search_term, contacts_list_view, db_conn):
+async def search_contacts(page, search_term, contacts_list_view, db):
     """Filters contacts based on search term."""
-    display_contacts(page, contacts_list_view, db_conn, search_term)
+    await display_contacts(page, contacts_list_view, db, search_term)
 
-def add_contact(page, inputs, contacts_list_view, db_conn):
+async def add_contact(page, inputs, contacts_list_view, db):
     """Adds a new contact with input validation."""
     name_input, phone_input, email_input = inputs
     
@@ -86,23 +535,27 @@ def add_contact(page, inputs, contacts_list_view, db_conn):
         return
     
     # Add contact to database
-    add_contact_db(db_conn, name_input.value.strip(), phone_input.value.strip(), email_input.value.strip())
+    contact = await db.add_contact(name_input.value.strip(), phone_input.value.strip(), email_input.value.strip())
     
     # Clear input fields
     for field in inputs:
         field.value = ""
     
-    # Refresh the contact list
-    display_contacts(page, contacts_list_view, db_conn)
+    # Show the new contact without rebuilding the list
+    insert_contact_card(page, contacts_list_view, db, contact)
+    await refresh_alphabet_bar(contacts_list_view, db)
     page.update()
 
-def show_delete_confirmation(page, contact_id, contact_name, db_conn, contacts_list_view):
+def show_delete_confirmation(page, contact_id, contact_name, db, contacts_list_view):
     """Shows confirmation dialog before deleting a contact."""
-    def confirm_delete(e):
-        delete_contact_db(db_conn, contact_id)
+    async def confirm_delete(e):
+        txn = await db.delete_contact(contact_id)
         dialog.open = False
+        if txn is not None:
+            remove_contact_card(page, contacts_list_view, contact_id)
+            show_undo_message(page, contacts_list_view, db, f"Deleted '{contact_name}'", txn)
+            await refresh_alphabet_bar(contacts_list_view, db)
         page.update()
-        display_contacts(page, contacts_list_view, db_conn)
     
     def cancel_delete(e):
         dialog.open = False
@@ -111,7 +564,7 @@ def show_delete_confirmation(page, contact_id, contact_name, db_conn, contacts_l
     dialog = ft.AlertDialog(
         modal=True,
         title=ft.Text("Confirm Delete"),
-        content=ft.Text(f"Are you sure you want to delete '{contact_name}'? This action cannot be undone."),
+        content=ft.Text(f"Are you sure you want to delete '{contact_name}'?"),
         actions=[
             ft.TextButton("Cancel", on_click=cancel_delete),
             ft.TextButton("Delete", on_click=confirm_delete, style=ft.ButtonStyle(color=ft.Colors.RED)),
@@ -120,7 +573,7 @@ def show_delete_confirmation(page, contact_id, contact_name, db_conn, contacts_l
     
     page.open(dialog)
 
-def open_edit_dialog(page, contact, db_conn, contacts_list_view):
+def open_edit_dialog(page, contact, db, contacts_list_view):
     """Opens a dialog to edit a contact's details."""
     contact_id, name, phone, email = contact
     
@@ -128,7 +581,7 @@ def open_edit_dialog(page, contact, db_conn, contacts_list_view):
     edit_phone = ft.TextField(label="Phone", value=phone or "", width=300)
     edit_email = ft.TextField(label="Email", value=email or "", width=300)
     
-    def save_and_close(e):
+    async def save_and_close(e):
         # Validation
         if not edit_name.value or not edit_name.value.strip():
             edit_name.error_text = "Name cannot be empty"
@@ -136,10 +589,14 @@ def open_edit_dialog(page, contact, db_conn, contacts_list_view):
             return
         
         edit_name.error_text = None
-        update_contact_db(db_conn, contact_id, edit_name.value.strip(), edit_phone.value.strip(), edit_email.value.strip())
+        updated = await db.update_contact(contact_id, edit_name.value.strip(), edit_phone.value.strip(), edit_email.value.strip())
         dialog.open = False
+        if updated is not None:
+            replace_contact_card(page, contacts_list_view, db, updated)
+        else:
+            remove_contact_card(page, contacts_list_view, contact_id)
+        await refresh_alphabet_bar(contacts_list_view, db)
         page.update()
-        display_contacts(page, contacts_list_view, db_conn)
     
     def cancel_edit(e):
         dialog.open = False
@@ -155,4 +612,314 @@ def open_edit_dialog(page, contact, db_conn, contacts_list_view):
         ],
     )
     
-    page.open(dialog)
\ No newline at end of file
+    page.open(dialog)
+
+def show_message(page, message):
+    """Shows a short message in a snack bar."""
+    page.open(ft.SnackBar(ft.Text(message)))
+
+async def import_contacts(page, path, contacts_list_view, db, status_text):
+    """Bulk-imports a CSV/vCard file, reporting progress in status_text."""
+    def on_progress(report):
+        status_text.value = f"Importing... {report.imported} added, {report.rejected} rejected"
+        page.update()
+    
+    try:
+        report = await db.import_file(path, progress=on_progress)
+    except (OSError, ValueError) as e:
+        status_text.value = ""
+        show_message(page, f"Import failed: {e}")
+        return
+    
+    status_text.value = ""
+    message = f"Imported {report.imported} contacts"
+    if report.rejected:
+        line_no, reason = report.errors[0]
+        message += f", rejected {report.rejected} (line {line_no}: {reason})"
+    show_message(page, message)
+    
+    # A bulk load touches too many rows for incremental updates
+    await refresh_alphabet_bar(contacts_list_view, db)
+    await display_contacts(page, contacts_list_view, db, _list_state(contacts_list_view)["search_term"])
+
+async def export_contacts(page, path, db):
+    """Streams all contacts to a CSV/vCard file."""
+    try:
+        count = await db.export_file(path)
+    except (OSError, ValueError) as e:
+        show_message(page, f"Export failed: {e}")
+        return
+    show_message(page, f"Exported {count} contacts to {path}")
+
+async def backup_contacts(page, path, db, status_text):
+    """Writes a consistent snapshot of the database to path while the app keeps running."""
+    shown = [-1]
+    
+    def on_progress(copied, total):
+        percent = copied * 100 // max(1, total)
+        if percent != shown[0]:
+            # Steps are small; only redraw when the percentage moves
+            shown[0] = percent
+            status_text.value = f"Backing up... {percent}%"
+            page.update()
+    
+    try:
+        await db.backup(path, progress=on_progress)
+    except (OSError, sqlite3.Error) as e:
+        status_text.value = ""
+        show_message(page, f"Backup failed: {e}")
+        return
+    status_text.value = ""
+    show_message(page, f"Backed up to {path}")
+
+MAX_DUPLICATE_GROUPS_SHOWN = 50
+
+async def show_duplicates_dialog(page, contacts_list_view, db):
+    """Finds contacts sharing a phone or email and offers to merge them.
+    
+    Merging keeps the oldest contact and fills its empty phone/email from the others.
+    """
+    groups = await db.find_duplicates()
+    if not groups:
+        show_message(page, "No duplicate contacts found")
+        return
+    
+    group_list = ft.Column(scroll=ft.ScrollMode.AUTO, height=350, width=400)
+    
+    async def apply_merge(merge_groups):
+        results = await db.merge_contacts([(group[0][0], [row[0] for row in group[1:]]) for group in merge_groups])
+        for merged, removed in results:
+            for contact_id in removed:
+                remove_contact_card(page, contacts_list_view, contact_id)
+            replace_contact_card(page, contacts_list_view, db, merged)
+        await refresh_alphabet_bar(contacts_list_view, db)
+        return sum(len(removed) for _, removed in results)
+    
+    def group_tile(group):
+        async def merge_one(e):
+            await apply_merge([group])
+            group_list.controls.remove(tile)
+            if not group_list.controls:
+                dialog.open = False
+            page.update()
+        
+        tile = ft.ListTile(
+            title=ft.Text(group[0][1]),
+            subtitle=ft.Text("\n".join(f"{name} · {phone or '-'} · {email or '-'}" for _, name, phone, email in group)),
+            trailing=ft.TextButton("Merge", on_click=merge_one),
+        )
+        return tile
+    
+    group_list.controls.extend(group_tile(group) for group in groups[:MAX_DUPLICATE_GROUPS_SHOWN])
+    
+    async def merge_all(e):
+        dialog.open = False
+        page.update()
+        removed = await apply_merge(groups)
+        show_message(page, f"Merged {len(groups)} groups, removed {removed} duplicates")
+        page.update()
+    
+    def close(e):
+        dialog.open = False
+        page.update()
+    
+    dialog = ft.AlertDialog(
+        modal=True,
+        title=ft.Text(f"{len(groups)} groups of duplicates"),
+        content=group_list,
+        actions=[
+            ft.TextButton("Close", on_click=close),
+            ft.TextButton(f"Merge all {len(groups)}", on_click=merge_all),
+        ],
+    )
+    page.open(dialog)
+
+def _refresh_selection_bar(state):
+    bar = state["selection_bar"]
+    if bar is None:
+        return
+    count = len(state["selected"])
+    bar.visible = count > 0
+    bar.controls[0].value = f"{count} selected"
+
+def toggle_selection(page, contacts_list_view, contact_id, selected):
+    """Adds or removes a contact from the bulk selection."""
+    state = _list_state(contacts_list_view)
+    if selected:
+        state["selected"].add(contact_id)
+    else:
+        state["selected"].discard(contact_id)
+    _refresh_selection_bar(state)
+    page.update()
+
+def clear_selection(page, contacts_list_view):
+    """Unticks every selected card."""
+    state = _list_state(contacts_list_view)
+    for contact_id in state["selected"]:
+        card = state["cards"].get(contact_id)
+        if card is not None:
+            card.checkbox.value = False
+    state["selected"].clear()
+    _refresh_selection_bar(state)
+    page.update()
+
+async def undo_change(page, contacts_list_view, db, txn):
+    """Reverts logged transaction txn and patches the list."""
+    try:
+        result = await db.undo(txn)
+    except UndoConflict as e:
+        show_message(page, f"Can't undo: {e}")
+        return
+    if result is None:
+        show_message(page, "Nothing to undo")
+        return
+    label, changed_rows, deleted_ids = result
+    await refresh_alphabet_bar(contacts_list_view, db)
+    if len(changed_rows) + len(deleted_ids) > MAX_INCREMENTAL_CHANGES:
+        await display_contacts(page, contacts_list_view, db, _list_state(contacts_list_view)["search_term"])
+    else:
+        apply_contact_changes(page, contacts_list_view, db, changed_rows, deleted_ids)
+    show_message(page, f"Undid {label}")
+    page.update()
+
+# How often each session checks the change feed for writes made elsewhere
+CHANGE_POLL_SECONDS = 2.0
+
+async def apply_remote_changes(page, contacts_list_view, db):
+    """Patches the list with contacts changed by other sessions since the last check."""
+    result = await db.sync()
+    if result is None:
+        return
+    changed_rows, deleted_ids, reloaded = result
+    await refresh_alphabet_bar(contacts_list_view, db)
+    if reloaded or len(changed_rows) + len(deleted_ids) > MAX_INCREMENTAL_CHANGES:
+        await display_contacts(page, contacts_list_view, db, _list_state(contacts_list_view)["search_term"])
+        return
+    apply_contact_changes(page, contacts_list_view, db, changed_rows, deleted_ids)
+    page.update()
+
+async def watch_changes(page, contacts_list_view, db, interval=CHANGE_POLL_SECONDS):
+    """Polls the change feed until cancelled; run one per session with page.run_task."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await apply_remote_changes(page, contacts_list_view, db)
+        except (sqlite3.Error, PoolTimeout) as e:
+            # A locked or busy database, or readers all taken by an export or scan, is retried on the next tick
+            logger.warning("change feed poll failed: %s", e)
+
+def show_undo_message(page, contacts_list_view, db, message, txn):
+    """Shows a snack bar whose Undo action reverts txn, the change just made."""
+    async def on_undo(e):
+        await undo_change(page, contacts_list_view, db, txn)
+    
+    page.open(ft.SnackBar(ft.Text(message), action="Undo", on_action=on_undo))
+
+def build_selection_bar(page, contacts_list_view, db):
+    """Builds the bar of bulk actions shown while contacts are selected."""
+    state = _list_state(contacts_list_view)
+    
+    async def delete_selected(e):
+        async def confirm(e):
+            dialog.open = False
+            page.update()
+            txn, deleted = await db.delete_contacts(list(state["selected"]))
+            await refresh_alphabet_bar(contacts_list_view, db)
+            if len(deleted) > MAX_INCREMENTAL_CHANGES:
+                state["selected"].clear()
+                await display_contacts(page, contacts_list_view, db, state["search_term"])
+            else:
+                apply_contact_changes(page, contacts_list_view, db, [], deleted)
+            show_undo_message(page, contacts_list_view, db, f"Deleted {len(deleted)} contacts", txn)
+            page.update()
+        
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Confirm Delete"),
+            content=ft.Text(f"Delete {len(state['selected'])} selected contacts?"),
+            actions=[
+                ft.TextButton("Cancel", on_click=lambda e: page.close(dialog)),
+                ft.TextButton("Delete", on_click=confirm, style=ft.ButtonStyle(color=ft.Colors.RED)),
+            ],
+        )
+        page.open(dialog)
+    
+    def edit_selected(e):
+        edit_phone = ft.TextField(label="Phone", hint_text="Leave empty to keep", width=300)
+        edit_email = ft.TextField(label="Email", hint_text="Leave empty to keep", width=300)
+        
+        async def save(e):
+            phone = edit_phone.value.strip() or None
+            email = edit_email.value.strip() or None
+            dialog.open = False
+            page.update()
+            if phone is None and email is None:
+                return
+            txn, rows = await db.update_contacts(list(state["selected"]), phone, email)
+            apply_contact_changes(page, contacts_list_view, db, rows, [])
+            show_undo_message(page, contacts_list_view, db, f"Updated {len(rows)} contacts", txn)
+            page.update()
+        
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text(f"Edit {len(state['selected'])} contacts"),
+            content=ft.Column([edit_phone, edit_email], height=150),
+            actions=[
+                ft.TextButton("Cancel", on_click=lambda e: page.close(dialog)),
+                ft.TextButton("Save", on_click=save),
+            ],
+        )
+        page.open(dialog)
+    
+    bar = ft.Row([
+        ft.Text("", weight=ft.FontWeight.BOLD),
+        ft.Row([
+            ft.TextButton("Edit", icon=ft.Icons.EDIT, on_click=edit_selected),
+            ft.TextButton("Delete", icon=ft.Icons.DELETE, on_click=delete_selected),
+            ft.IconButton(icon=ft.Icons.CLOSE, tooltip="Clear selection",
+                          on_click=lambda e: clear_selection(page, contacts_list_view)),
+        ], spacing=0),
+    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN, visible=False)
+    state["selection_bar"] = bar
+    _refresh_selection_bar(state)
+    return bar
+
+ALPHABET = "#ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+async def refresh_alphabet_bar(contacts_list_view, db):
+    """Dims the letters no contact starts with and shows each letter's count as a tooltip.
+    
+    Letters count names starting with either case; "#" covers names that start with anything else.
+    """
+    state = _list_state(contacts_list_view)
+    bar = state["alphabet_bar"]
+    if bar is None:
+        return
+    counts = {}
+    for initial, count in await db.initial_counts():
+        letter = initial.upper()
+        if letter not in ALPHABET:
+            letter = "#"
+        counts[letter] = counts.get(letter, 0) + count
+    for item in bar.controls:
+        count = counts.get(item.data, 0)
+        item.tooltip = f"{item.data}: {count}"
+        item.content.opacity = 1 if count else 0.3
+
+def build_alphabet_bar(page, contacts_list_view, db):
+    """Builds the A-Z sidebar that jumps the list to a letter."""
+    state = _list_state(contacts_list_view)
+    
+    async def on_letter(e):
+        await jump_to_initial(page, contacts_list_view, db, e.control.data)
+    
+    bar = ft.Column(
+        [ft.Container(ft.Text(letter, size=11, weight=ft.FontWeight.BOLD), data=letter,
+                      padding=ft.padding.symmetric(horizontal=4), on_click=on_letter)
+         for letter in ALPHABET],
+        spacing=0,
+        scroll=ft.ScrollMode.HIDDEN,
+        horizontal_alignment=ft.CrossAxisAlignment.CENTER
+    )
+    state["alphabet_bar"] = bar
+    return bar
@@ -0,0 +1,202 @@
+# async_db.py
+"""Awaitable facade over the contact DB for use from Flet async event handlers.
+
+Each operation is queued to a lane served by its own worker thread(s):
+
+- "write": a single dedicated writer thread, so single-row writes stay ordered
+- "read": a few reader threads that borrow connections from the pool
+- "bulk": one thread for imports, which take the pool's write lock per batch
+  so interactive writes can slip in between batches, and for backups
+- "image": a couple of threads that decode photo thumbnails
+
+Handlers await the result, so the event loop keeps rendering while SQLite works.
+Contact reads and single-row writes go through a ContactRepository, so list
+renders and searches are answered from its in-memory index.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from avatars import AvatarStore
+from backup import BACKUP_PAGES, BACKUP_STEP_SLEEP, backup_db
+from db_pool import READER_POOL_SIZE
+from dedupe import find_duplicate_groups
+from import_export import IMPORT_BATCH_SIZE, export_file, import_file
+from repository import ContactRepository
+
+logger = logging.getLogger(__name__)
+
+SLOW_OPERATION_SECONDS = 0.25
+AVATAR_WORKERS = 2
+
+
+class OperationStats:
+    """Queue-wait and run-time latency per operation name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, name, wait, run):
+        with self._lock:
+            op = self._ops.get(name)
+            if op is None:
+                op = self._ops[name] = {"count": 0, "wait_total": 0.0, "wait_max": 0.0,
+                                        "run_total": 0.0, "run_max": 0.0}
+            op["count"] += 1
+            op["wait_total"] += wait
+            op["run_total"] += run
+            op["wait_max"] = max(op["wait_max"], wait)
+            op["run_max"] = max(op["run_max"], run)
+
+    def snapshot(self):
+        """Returns {name: {count, wait_avg, wait_max, run_avg, run_max}} in seconds."""
+        with self._lock:
+            return {
+                name: {
+                    "count": op["count"],
+                    "wait_avg": op["wait_total"] / op["count"],
+                    "wait_max": op["wait_max"],
+                    "run_avg": op["run_total"] / op["count"],
+                    "run_max": op["run_max"],
+                }
+                for name, op in self._ops.items()
+            }
+
+
+class AsyncContactDB:
+    """Runs database.py calls on background worker threads and returns awaitables."""
+
+    def __init__(self, pool, readers=READER_POOL_SIZE):
+        self.pool = pool
+        self.contacts = ContactRepository(pool)
+        self.avatars = AvatarStore(pool)
+        self.stats = OperationStats()
+        self._lanes = {"write": queue.Queue(), "read": queue.Queue(), "bulk": queue.Queue(), "image": queue.Queue()}
+        self._threads = []
+        for lane, count in (("write", 1), ("read", readers), ("bulk", 1), ("image", AVATAR_WORKERS)):
+            for i in range(count):
+                thread = threading.Thread(target=self._worker, args=(self._lanes[lane],),
+                                          name=f"db-{lane}-{i}", daemon=True)
+                thread.start()
+                self._threads.append((lane, thread))
+
+    def _worker(self, requests):
+        while True:
+            item = requests.get()
+            if item is None:
+                break
+            name, fn, args, future, loop, enqueued = item
+            started = time.perf_counter()
+            result = error = None
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                error = e
+            finished = time.perf_counter()
+
+            wait, run = started - enqueued, finished - started
+            self.stats.record(name, wait, run)
+            if wait + run >= SLOW_OPERATION_SECONDS:
+                logger.warning("slow db op %s: waited %.1f ms, ran %.1f ms", name, wait * 1000, run * 1000)
+            else:
+                logger.debug("db op %s: waited %.1f ms, ran %.1f ms", name, wait * 1000, run * 1000)
+
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    async def run(self, fn, *args, lane="read"):
+        """Queues fn(*args) on the given lane and awaits its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._lanes[lane].put((fn.__name__, fn, args, future, loop, time.perf_counter()))
+        return await future
+
+    async def get_all_contacts(self, search_term=None):
+        return await self.run(self.contacts.search, search_term)
+
+    async def contacts_page(self, search_term=None, after=None, before=None):
+        return await self.run(self.contacts.page, search_term, after, before)
+
+    async def initial_counts(self):
+        return await self.run(self.contacts.initial_counts)
+
+    async def fuzzy_search(self, search_term):
+        return await self.run(self.contacts.fuzzy_search, search_term)
+
+    async def add_contact(self, name, phone, email):
+        return await self.run(self.contacts.add, name, phone, email, lane="write")
+
+    async def update_contact(self, contact_id, name, phone, email):
+        return await self.run(self.contacts.update, contact_id, name, phone, email, lane="write")
+
+    async def delete_contact(self, contact_id):
+        return await self.run(self.contacts.delete, contact_id, lane="write")
+
+    async def find_duplicates(self):
+        return await self.run(find_duplicate_groups, self.pool)
+
+    async def merge_contacts(self, groups):
+        return await self.run(self.contacts.merge, groups, lane="write")
+
+    async def update_contacts(self, contact_ids, phone=None, email=None):
+        return await self.run(self.contacts.update_many, contact_ids, phone, email, lane="write")
+
+    async def delete_contacts(self, contact_ids):
+        return await self.run(self.contacts.delete_many, contact_ids, lane="write")
+
+    async def undo(self, txn):
+        return await self.run(self.contacts.undo, txn, lane="write")
+
+    async def avatar_thumbnail(self, contact_id):
+        # Memory hits skip the thread hop
+        cached = self.avatars.cached(contact_id)
+        if cached is not None:
+            return cached
+        return await self.run(self.avatars.thumbnail, contact_id, lane="image")
+
+    async def set_photo(self, contact_id, path):
+        return await self.run(self.avatars.set_photo, contact_id, path, lane="write")
+
+    async def remove_photo(self, contact_id):
+        return await self.run(self.avatars.remove_photo, contact_id, lane="write")
+
+    async def sync(self):
+        return await self.run(self.contacts.sync)
+
+    async def import_file(self, path, progress=None):
+        return await self.run(self._import_and_reload, path, progress, lane="bulk")
+
+    def _import_and_reload(self, path, progress):
+        try:
+            return import_file(self.pool, path, IMPORT_BATCH_SIZE, progress)
+        finally:
+            # Rows were inserted behind the repository's back
+            self.contacts.reload()
+
+    async def export_file(self, path):
+        return await self.run(export_file, self.pool, path)
+
+    async def backup(self, dest, progress=None):
+        # Copies from its own connection, so only queues behind other bulk work
+        return await self.run(backup_db, self.pool.path, dest, BACKUP_PAGES, BACKUP_STEP_SLEEP, progress, lane="bulk")
+
+    def close(self):
+        """Stops the worker threads once queued work drains, then closes the pool."""
+        for lane, _ in self._threads:
+            self._lanes[lane].put(None)
+        for _, thread in self._threads:
+            thread.join()
+        self.pool.close()
+
+
+def _resolve(future, result, error):
+    # The awaiting handler may have been cancelled while the query ran
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -0,0 +1,183 @@
+# avatars.py
+"""Contact photo thumbnails, made on demand.
+
+Originals live in the contact_avatars table. A thumbnail is decoded only
+when a card asks for it. It is then kept in a size-bounded in-memory LRU
+cache and in an on-disk cache, both keyed by (contact id, avatar version),
+so a replaced photo never shows a stale thumbnail and later launches skip
+the decode. Pillow is optional: without it, cards keep showing initials.
+"""
+
+import base64
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from database import delete_avatar_db, get_avatar_db, get_avatar_versions_db, set_avatar_db
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_SIZE = 80                    # px; cards show 40 px avatars, doubled for high-DPI screens
+MEMORY_CACHE_BYTES = 8 * 1024 * 1024   # base64 text held in memory
+MAX_AVATAR_BYTES = 10 * 1024 * 1024
+
+
+class AvatarError(Exception):
+    """Raised when a photo cannot be stored."""
+    pass
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    """Center-cropped size x size PNG of the image bytes in data."""
+    image = Image.open(io.BytesIO(data))
+    # JPEGs decode straight to a reduced scale, far cheaper than a full decode
+    image.draft("RGB", (size, size))
+    image = ImageOps.fit(ImageOps.exif_transpose(image).convert("RGBA"), (size, size))
+    out = io.BytesIO()
+    image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+class ThumbnailCache:
+    """Least-recently-used map of key -> base64 thumbnail, bounded by total length."""
+
+    def __init__(self, max_bytes=MEMORY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def discard(self, key):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+
+
+class AvatarStore:
+    """Photo originals in the database, thumbnails served through the memory and disk caches."""
+
+    def __init__(self, pool, thumbnail_dir=THUMBNAIL_DIR, size=THUMBNAIL_SIZE, cache_bytes=MEMORY_CACHE_BYTES):
+        self.pool = pool
+        self.thumbnail_dir = thumbnail_dir
+        self.size = size
+        self.cache = ThumbnailCache(cache_bytes)
+        self._lock = threading.Lock()
+        # Small enough to hold for every contact; tells cards whether to ask for a thumbnail at all
+        self._versions = get_avatar_versions_db(pool)
+
+    @property
+    def enabled(self):
+        """Whether thumbnails can be made (Pillow is installed)."""
+        return Image is not None
+
+    def version(self, contact_id):
+        """The contact's avatar version, or None if it has no photo."""
+        with self._lock:
+            return self._versions.get(contact_id)
+
+    def _path(self, contact_id, version):
+        return os.path.join(self.thumbnail_dir, f"{contact_id}-{version}-{self.size}.png")
+
+    def cached(self, contact_id):
+        """The thumbnail as base64 if it is in memory, without touching disk or decoding."""
+        version = self.version(contact_id)
+        if version is None:
+            return None
+        return self.cache.get((contact_id, version))
+
+    def thumbnail(self, contact_id):
+        """The thumbnail as base64, from memory, disk or a fresh decode; None if there is none.
+
+        Blocks on file I/O and decoding, so call it from a worker thread.
+        """
+        version = self.version(contact_id)
+        if version is None:
+            return None
+        key = (contact_id, version)
+        encoded = self.cache.get(key)
+        if encoded is not None:
+            return encoded
+
+        path = self._path(contact_id, version)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            if not self.enabled:
+                return None
+            found = get_avatar_db(self.pool, contact_id)
+            if found is None or found[0] != version:
+                # Replaced or removed while this request waited
+                return None
+            try:
+                data = make_thumbnail(found[1], self.size)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                return None
+            os.makedirs(self.thumbnail_dir, exist_ok=True)
+            # Per-thread temp name: two workers may render the same thumbnail at once
+            partial = f"{path}.{threading.get_ident()}.part"
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+
+        encoded = base64.b64encode(data).decode("ascii")
+        self.cache.put(key, encoded)
+        return encoded
+
+    def _forget(self, contact_id, version):
+        if version is None:
+            return
+        self.cache.discard((contact_id, version))
+        try:
+            os.remove(self._path(contact_id, version))
+        except FileNotFoundError:
+            pass
+
+    def set_photo(self, contact_id, path):
+        """Stores the image file at path as the contact's photo and returns the new version."""
+        if os.path.getsize(path) > MAX_AVATAR_BYTES:
+            raise AvatarError(f"Photo is larger than {MAX_AVATAR_BYTES // (1024 * 1024)} MB")
+        with open(path, "rb") as f:
+            data = f.read()
+        if self.enabled:
+            try:
+                Image.open(io.BytesIO(data)).verify()
+            except Exception:  # Pillow raises several unrelated types for corrupt files
+                raise AvatarError("Not a supported image file")
+        version = set_avatar_db(self.pool, contact_id, data)
+        with self._lock:
+            old = self._versions.get(contact_id)
+            self._versions[contact_id] = version
+        self._forget(contact_id, old)
+        return version
+
+    def remove_photo(self, contact_id):
+        """Deletes the contact's photo and its cached thumbnails."""
+        delete_avatar_db(self.pool, contact_id)
+        with self._lock:
+            old = self._versions.pop(contact_id, None)
+        self._forget(contact_id, old)
@@ -0,0 +1,159 @@
+# backup.py
+"""Online snapshots of the contact database.
+
+Snapshots use SQLite's backup API, copying BACKUP_PAGES pages per step and
+sleeping between steps. The source connection holds a read transaction for
+the whole copy, so with WAL journaling the snapshot stays consistent while
+writers keep committing. Without it, each commit from another connection
+would restart the copy. Each snapshot is written to a .part file and renamed
+into place, so a crash never leaves a torn backup; the .part files such a
+crash strands are removed by the next prune.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = "backups"
+BACKUP_PAGES = 1024          # pages per step; 4 MB at the default page size
+BACKUP_STEP_SLEEP = 0.005    # seconds between steps, so the copy never hogs the disk
+SNAPSHOT_INTERVAL = 6 * 3600
+KEEP_SNAPSHOTS = 10
+SNAPSHOT_PREFIX = "contacts-"
+SNAPSHOT_SUFFIX = ".db"
+PARTIAL_SUFFIX = ".part"
+# A .part file untouched this long was left by a copy that died; live copies write every step
+STALE_PARTIAL_AGE = 3600
+
+
+def backup_db(path, dest, pages=BACKUP_PAGES, sleep=BACKUP_STEP_SLEEP, progress=None):
+    """Copies the database at path to dest without blocking writers; returns dest.
+
+    progress(copied_pages, total_pages) is called after every step.
+    """
+    partial = dest + PARTIAL_SUFFIX
+    source = sqlite3.connect(path)
+    try:
+        # Pin one read snapshot for the whole copy
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        target = sqlite3.connect(partial)
+        try:
+            source.backup(
+                target,
+                pages=pages,
+                sleep=sleep,
+                progress=(lambda status, remaining, total: progress(total - remaining, total)) if progress else None,
+            )
+        finally:
+            target.close()
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        source.rollback()
+        source.close()
+    os.replace(partial, dest)
+    return dest
+
+
+def list_snapshots(backup_dir=BACKUP_DIR):
+    """Paths of the snapshots in backup_dir, oldest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(
+        name for name in os.listdir(backup_dir)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)
+    )
+    return [os.path.join(backup_dir, name) for name in names]
+
+
+def _stale_partials(backup_dir, max_age=STALE_PARTIAL_AGE):
+    """Paths of snapshot .part files in backup_dir not written to for max_age seconds."""
+    if not os.path.isdir(backup_dir):
+        return []
+    cutoff = time.time() - max_age
+    paths = [
+        os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX + PARTIAL_SUFFIX)
+    ]
+    return [path for path in paths if os.path.getmtime(path) < cutoff]
+
+
+def prune_snapshots(backup_dir=BACKUP_DIR, keep=KEEP_SNAPSHOTS):
+    """Deletes all but the newest keep snapshots and returns the deleted paths.
+
+    Also deletes stale .part files, which a copy leaves behind when the
+    process dies before it can rename or remove them.
+    """
+    snapshots = list_snapshots(backup_dir)
+    expired = snapshots[:max(0, len(snapshots) - keep)] + _stale_partials(backup_dir)
+    for path in expired:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another session pruned it first
+            pass
+    return expired
+
+
+def take_snapshot(path, backup_dir=BACKUP_DIR, keep=KEEP_SNAPSHOTS, progress=None):
+    """Backs path up to a timestamped file in backup_dir, then applies retention; returns the new path."""
+    os.makedirs(backup_dir, exist_ok=True)
+    # Timestamps sort lexically, so list_snapshots' name order is age order
+    dest = os.path.join(backup_dir, f"{SNAPSHOT_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}{SNAPSHOT_SUFFIX}")
+    backup_db(path, dest, progress=progress)
+    prune_snapshots(backup_dir, keep)
+    return dest
+
+
+class SnapshotScheduler:
+    """Takes a snapshot every interval seconds on a daemon thread.
+
+    The first snapshot is taken at start() when the newest one is already older than interval.
+    """
+
+    def __init__(self, path, backup_dir=BACKUP_DIR, interval=SNAPSHOT_INTERVAL, keep=KEEP_SNAPSHOTS):
+        self.path = path
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.keep = keep
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _next_delay(self):
+        snapshots = list_snapshots(self.backup_dir)
+        if not snapshots:
+            return 0
+        age = time.time() - os.path.getmtime(snapshots[-1])
+        return max(0, self.interval - age)
+
+    def _run(self):
+        delay = self._next_delay()
+        while not self._stop.wait(delay):
+            delay = self.interval
+            if not os.path.exists(self.path):
+                # Nothing to back up until the app has created the database
+                continue
+            try:
+                dest = take_snapshot(self.path, self.backup_dir, self.keep)
+                logger.info("snapshot written to %s", dest)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("scheduled snapshot failed: %s", e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-snapshots", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops scheduling; a snapshot already in progress runs to completion."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
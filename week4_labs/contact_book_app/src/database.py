@@ -1,53 +1,564 @@
 # database.py
-import sqlite3
+import heapq
+import time
 
-def init_db():
-    """Initializes the database and creates the contacts table if it doesn't exist."""
-    conn = sqlite3.connect('contacts.db', check_same_thread=False)
-    cursor = conn.cursor()
+from db_pool import ConnectionPool, reading, writing
+from fuzzy import phonetic_keys, similarity, trigrams
+from normalize import normalize_email, normalize_phone
+
+DB_PATH = 'contacts.db'
+
+FUZZY_LIMIT = 20
+# Postings read per query trigram; very common trigrams are truncated
+# rather than scanned in full, which keeps fuzzy search bounded on large books
+FUZZY_POSTINGS_PER_GRAM = 2000
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SCORE = 0.2
+
+# Transaction log entries older than this are pruned at startup
+LOG_RETENTION_SECONDS = 30 * 24 * 3600
+# SQLite's default limit on host parameters is 999
+CHUNK_SIZE = 500
+
+class UndoConflict(Exception):
+    """Raised when a transaction cannot be undone because a later one changed the same contacts."""
+    pass
+
+def index_contact_names(cursor, rows):
+    """Adds trigram and phonetic index entries for (id, name) rows."""
+    cursor.executemany(
+        "INSERT OR IGNORE INTO contact_trigrams (trigram, contact_id) VALUES (?, ?)",
+        ((gram, contact_id) for contact_id, name in rows for gram in trigrams(name))
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO contact_phonetics (code, contact_id) VALUES (?, ?)",
+        ((code, contact_id) for contact_id, name in rows for code in phonetic_keys(name))
+    )
+
+def _unindex_contact_name(cursor, contact_id):
+    cursor.execute("DELETE FROM contact_trigrams WHERE contact_id = ?", (contact_id,))
+    cursor.execute("DELETE FROM contact_phonetics WHERE contact_id = ?", (contact_id,))
+
+def _add_column(cursor, table, column, declaration):
+    # Skips columns that exist, so a database left half-migrated by an older version still upgrades
+    if column not in {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _migrate_fuzzy_index(cursor):
+    """v1: trigram and Soundex lookup tables for fuzzy name search."""
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS contacts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
+        CREATE TABLE IF NOT EXISTS contact_trigrams (
+            trigram TEXT NOT NULL,
+            contact_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, contact_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contact_phonetics (
+            code TEXT NOT NULL,
+            contact_id INTEGER NOT NULL,
+            PRIMARY KEY (code, contact_id)
+        ) WITHOUT ROWID
+    ''')
+    # Deletes look entries up by contact
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_trigrams_contact ON contact_trigrams (contact_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_phonetics_contact ON contact_phonetics (contact_id)")
+    index_contact_names(cursor, cursor.connection.execute("SELECT id, name FROM contacts").fetchall())
+
+def _migrate_normalized_columns(cursor):
+    """v2: indexed, normalized phone and email columns for exact lookups and dedup."""
+    conn = cursor.connection
+    conn.create_function("normalize_phone", 1, normalize_phone, deterministic=True)
+    conn.create_function("normalize_email", 1, normalize_email, deterministic=True)
+    _add_column(cursor, "contacts", "phone_norm", "TEXT")
+    _add_column(cursor, "contacts", "email_norm", "TEXT")
+    cursor.execute("UPDATE contacts SET phone_norm = normalize_phone(phone), email_norm = normalize_email(email)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contacts_phone_norm ON contacts (phone_norm)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contacts_email_norm ON contacts (email_norm)")
+
+def _migrate_transaction_log(cursor):
+    """v3: transaction log of before-images, used for undo."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contact_txns (
+            txn INTEGER PRIMARY KEY AUTOINCREMENT,
+            label TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            undone INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # op is 'insert', 'update' or 'delete'; name/phone/email hold the row as it was before
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contact_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            txn INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            contact_id INTEGER NOT NULL,
+            name TEXT,
             phone TEXT,
             email TEXT
         )
     ''')
-    conn.commit()
-    return conn
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contact_log_txn ON contact_log (txn)")
 
-def add_contact_db(conn, name, phone, email):
-    """Adds a new contact to the database."""
-    cursor = conn.cursor()
+def _migrate_initial_counts(cursor):
+    """v4: name index plus per-initial counts kept current by triggers, for the A-Z jump bar."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_contacts_name ON contacts (name)")
+    # initial is the first character as stored; readers fold case when grouping by letter
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contact_initials (
+            initial TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
     cursor.execute(
-        "INSERT INTO contacts (name, phone, email) VALUES (?, ?, ?)",
-        (name, phone, email)
+        "INSERT INTO contact_initials (initial, count) SELECT substr(name, 1, 1), COUNT(*) FROM contacts GROUP BY 1"
     )
-    conn.commit()
+    # Triggers cover every write path, including bulk imports
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_initials_insert AFTER INSERT ON contacts BEGIN
+            INSERT INTO contact_initials (initial, count) VALUES (substr(NEW.name, 1, 1), 1)
+            ON CONFLICT (initial) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_initials_delete AFTER DELETE ON contacts BEGIN
+            UPDATE contact_initials SET count = count - 1 WHERE initial = substr(OLD.name, 1, 1);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_initials_rename AFTER UPDATE OF name ON contacts
+        WHEN substr(OLD.name, 1, 1) IS NOT substr(NEW.name, 1, 1) BEGIN
+            UPDATE contact_initials SET count = count - 1 WHERE initial = substr(OLD.name, 1, 1);
+            INSERT INTO contact_initials (initial, count) VALUES (substr(NEW.name, 1, 1), 1)
+            ON CONFLICT (initial) DO UPDATE SET count = count + 1;
+        END
+    ''')
+
+def _migrate_avatars(cursor):
+    """v5: contact photos, kept apart from the contact rows so list queries never read image data."""
+    # version changes with every new photo and keys the thumbnail caches
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contact_avatars (
+            contact_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            image BLOB NOT NULL
+        )
+    ''')
 
-def get_all_contacts_db(conn, search_term=None):
-    """Retrieves all contacts from the database, optionally filtered by search term."""
+# Applied in order; PRAGMA user_version records how many have run
+MIGRATIONS = [
+    _migrate_fuzzy_index,
+    _migrate_normalized_columns,
+    _migrate_transaction_log,
+    _migrate_initial_counts,
+    _migrate_avatars,
+]
+
+def _migrate(conn):
+    """Applies each pending migration in its own transaction, together with its user_version bump.
+
+    The explicit BEGIN matters: outside a transaction sqlite3 runs DDL such as
+    ALTER TABLE in autocommit mode, so a crash mid-migration would leave the
+    schema changed but the version not, and the next start would fail.
+    """
     cursor = conn.cursor()
-    if search_term:
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+def init_db(path=DB_PATH):
+    """Opens the tuned connection pool, creates the contacts table and applies pending migrations."""
+    pool = ConnectionPool(path)
+    with pool.writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS contacts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                phone TEXT,
+                email TEXT
+            )
+        ''')
+        conn.commit()
+        _migrate(conn)
+        prune_log_db(conn)
+        prune_avatars_db(conn)
+    return pool
+
+def begin_txn(cursor, label):
+    """Starts a logged transaction and returns its txn id."""
+    cursor.execute("INSERT INTO contact_txns (label, created_at) VALUES (?, ?)", (label, time.time()))
+    return cursor.lastrowid
+
+def log_changes(cursor, txn, op, contact_ids):
+    """Records the current state of contact_ids as before-images for op."""
+    for start in range(0, len(contact_ids), CHUNK_SIZE):
+        chunk = contact_ids[start:start + CHUNK_SIZE]
+        if op == "insert":
+            cursor.executemany(
+                "INSERT INTO contact_log (txn, op, contact_id) VALUES (?, 'insert', ?)",
+                ((txn, contact_id) for contact_id in chunk)
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO contact_log (txn, op, contact_id, name, phone, email) "
+                f"SELECT ?, ?, id, name, phone, email FROM contacts WHERE id IN ({','.join('?' * len(chunk))})",
+                (txn, op, *chunk)
+            )
+
+def prune_log_db(conn, max_age=LOG_RETENTION_SECONDS):
+    """Drops transaction log entries older than max_age seconds."""
+    with writing(conn) as conn:
+        cursor = conn.cursor()
+        cutoff = time.time() - max_age
+        cursor.execute(
+            "DELETE FROM contact_log WHERE txn IN (SELECT txn FROM contact_txns WHERE created_at < ?)", (cutoff,)
+        )
+        cursor.execute("DELETE FROM contact_txns WHERE created_at < ?", (cutoff,))
+        conn.commit()
+
+def get_change_version_db(conn):
+    """Returns the change feed version: the seq of the newest transaction log entry, 0 if none."""
+    with reading(conn) as conn:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM contact_log").fetchone()[0]
+
+def get_changes_since_db(conn, since):
+    """Returns (version, changed_rows, deleted_ids) for contacts written after feed version since.
+
+    Rows are read as they are now, so a row written again after version may be
+    reported twice across calls. Returns None if the log no longer reaches back
+    to since (entries were pruned), in which case the caller must reload.
+    """
+    with reading(conn) as conn:
+        cursor = conn.cursor()
+        version, oldest = cursor.execute("SELECT COALESCE(MAX(seq), 0), MIN(seq) FROM contact_log").fetchone()
+        if version < since or (oldest is not None and oldest > since + 1):
+            return None
+        if version == since:
+            return version, [], []
+        cursor.execute("SELECT DISTINCT contact_id FROM contact_log WHERE seq > ? AND seq <= ?", (since, version))
+        contact_ids = [contact_id for (contact_id,) in cursor.fetchall()]
+        rows = _select_rows(cursor, contact_ids)
+    found = {row[0] for row in rows}
+    return version, rows, [contact_id for contact_id in contact_ids if contact_id not in found]
+
+def prune_avatars_db(conn):
+    """Drops photos of deleted contacts, unless the transaction log could still undo the delete."""
+    with writing(conn) as conn:
+        conn.execute(
+            "DELETE FROM contact_avatars WHERE contact_id NOT IN (SELECT id FROM contacts) "
+            "AND contact_id NOT IN (SELECT contact_id FROM contact_log)"
+        )
+        conn.commit()
+
+def set_avatar_db(conn, contact_id, image):
+    """Stores image bytes as a contact's photo and returns the new avatar version."""
+    version = time.time_ns()
+    with writing(conn) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO contact_avatars (contact_id, version, image) VALUES (?, ?, ?)",
+            (contact_id, version, image)
+        )
+        conn.commit()
+    return version
+
+def delete_avatar_db(conn, contact_id):
+    """Removes a contact's photo."""
+    with writing(conn) as conn:
+        conn.execute("DELETE FROM contact_avatars WHERE contact_id = ?", (contact_id,))
+        conn.commit()
+
+def get_avatar_versions_db(conn):
+    """Returns {contact_id: avatar version} for every contact with a photo."""
+    with reading(conn) as conn:
+        return dict(conn.execute("SELECT contact_id, version FROM contact_avatars").fetchall())
+
+def get_avatar_db(conn, contact_id):
+    """Returns (version, image bytes) of a contact's photo, or None."""
+    with reading(conn) as conn:
+        return conn.execute(
+            "SELECT version, image FROM contact_avatars WHERE contact_id = ?", (contact_id,)
+        ).fetchone()
+
+def add_contact_db(conn, name, phone, email):
+    """Adds a new contact to the database and returns the inserted row."""
+    with writing(conn) as conn:
+        cursor = conn.cursor()
         cursor.execute(
-            "SELECT id, name, phone, email FROM contacts WHERE name LIKE ? ORDER BY name",
-            (f'%{search_term}%',)
+            "INSERT INTO contacts (name, phone, email, phone_norm, email_norm) VALUES (?, ?, ?, ?, ?)",
+            (name, phone, email, normalize_phone(phone), normalize_email(email))
         )
-    else:
-        cursor.execute("SELECT id, name, phone, email FROM contacts ORDER BY name")
-    return cursor.fetchall()
+        contact_id = cursor.lastrowid
+        index_contact_names(cursor, [(contact_id, name)])
+        log_changes(cursor, begin_txn(cursor, "add"), "insert", [contact_id])
+        conn.commit()
+    return (contact_id, name, phone, email)
+
+def get_all_contacts_db(conn, search_term=None, fuzzy=False, limit=FUZZY_LIMIT):
+    """Retrieves all contacts from the database, optionally filtered by search term.
+
+    With fuzzy=True the search term is matched by trigram similarity and sound,
+    and at most limit rows are returned, best match first.
+    """
+    if fuzzy and search_term:
+        return fuzzy_search_contacts_db(conn, search_term, limit)
+    with reading(conn) as conn:
+        cursor = conn.cursor()
+        if search_term:
+            cursor.execute(
+                "SELECT id, name, phone, email FROM contacts WHERE name LIKE ? ORDER BY name",
+                (f'%{search_term}%',)
+            )
+        else:
+            cursor.execute("SELECT id, name, phone, email FROM contacts ORDER BY name")
+        return cursor.fetchall()
+
+def fuzzy_search_contacts_db(conn, search_term, limit=FUZZY_LIMIT):
+    """Returns up to limit contacts whose names resemble search_term, best first.
+
+    Candidates come from the trigram/phonetic index tables, so only a bounded
+    number of rows is scored no matter how large the table is.
+    """
+    query_grams = trigrams(search_term)
+    query_keys = phonetic_keys(search_term)
+    if not query_grams:
+        return []
+
+    with reading(conn) as conn:
+        cursor = conn.cursor()
+        shared = {}
+        for gram in query_grams:
+            cursor.execute(
+                "SELECT contact_id FROM contact_trigrams WHERE trigram = ? LIMIT ?",
+                (gram, FUZZY_POSTINGS_PER_GRAM)
+            )
+            for (contact_id,) in cursor:
+                shared[contact_id] = shared.get(contact_id, 0) + 1
+        candidates = set(heapq.nlargest(FUZZY_CANDIDATES, shared, key=shared.get))
+        for code in query_keys:
+            cursor.execute(
+                "SELECT contact_id FROM contact_phonetics WHERE code = ? LIMIT ?",
+                (code, FUZZY_CANDIDATES)
+            )
+            candidates.update(contact_id for (contact_id,) in cursor)
+        if not candidates:
+            return []
+
+        placeholders = ",".join("?" * len(candidates))
+        cursor.execute(
+            f"SELECT id, name, phone, email FROM contacts WHERE id IN ({placeholders})",
+            tuple(candidates)
+        )
+        scored = [(similarity(query_grams, query_keys, row[1]), row) for row in cursor.fetchall()]
+
+    best = heapq.nlargest(limit, (item for item in scored if item[0] >= FUZZY_MIN_SCORE), key=lambda item: item[0])
+    return [row for _, row in best]
 
 def update_contact_db(conn, contact_id, name, phone, email):
-    """Updates an existing contact in the database."""
-    cursor = conn.cursor()
+    """Updates an existing contact and returns the updated row, or None if it no longer exists."""
+    with writing(conn) as conn:
+        cursor = conn.cursor()
+        log_changes(cursor, begin_txn(cursor, "edit"), "update", [contact_id])
+        cursor.execute(
+            "UPDATE contacts SET name = ?, phone = ?, email = ?, phone_norm = ?, email_norm = ? WHERE id = ?",
+            (name, phone, email, normalize_phone(phone), normalize_email(email), contact_id)
+        )
+        updated = cursor.rowcount
+        if updated:
+            _unindex_contact_name(cursor, contact_id)
+            index_contact_names(cursor, [(contact_id, name)])
+        conn.commit()
+    return (contact_id, name, phone, email) if updated else None
+
+def delete_contact_db(conn, contact_id):
+    """Deletes a contact and returns the txn id of the delete, or None if nothing was deleted."""
+    with writing(conn) as conn:
+        cursor = conn.cursor()
+        txn = begin_txn(cursor, "delete")
+        log_changes(cursor, txn, "delete", [contact_id])
+        cursor.execute("DELETE FROM contacts WHERE id = ?", (contact_id,))
+        deleted = cursor.rowcount
+        _unindex_contact_name(cursor, contact_id)
+        conn.commit()
+    return txn if deleted else None
+
+def get_initial_counts_db(conn):
+    """Returns [(initial, count), ...] for every first character in use, exactly as stored (case included)."""
+    with reading(conn) as conn:
+        return conn.execute("SELECT initial, count FROM contact_initials WHERE count > 0 ORDER BY initial").fetchall()
+
+def find_contacts_by_phone_db(conn, phone):
+    """Contacts whose phone normalizes to the same number, via the phone_norm index."""
+    phone_norm = normalize_phone(phone)
+    if phone_norm is None:
+        return []
+    with reading(conn) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, phone, email FROM contacts WHERE phone_norm = ? ORDER BY name", (phone_norm,))
+        return cursor.fetchall()
+
+def find_contacts_by_email_db(conn, email):
+    """Contacts with the same email ignoring case and whitespace, via the email_norm index."""
+    email_norm = normalize_email(email)
+    if email_norm is None:
+        return []
+    with reading(conn) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, phone, email FROM contacts WHERE email_norm = ? ORDER BY name", (email_norm,))
+        return cursor.fetchall()
+
+def _merge_group(cursor, txn, keep_id, duplicate_ids):
+    ids = [keep_id] + [cid for cid in duplicate_ids if cid != keep_id]
+    placeholders = ",".join("?" * len(ids))
+    cursor.execute(f"SELECT id, name, phone, email FROM contacts WHERE id IN ({placeholders})", ids)
+    rows = {row[0]: row for row in cursor.fetchall()}
+    if keep_id not in rows:
+        return None, []
+
+    # Keep the surviving contact's values; fill its blanks from the duplicates
+    _, name, phone, email = rows[keep_id]
+    removed = [cid for cid in ids[1:] if cid in rows]
+    for cid in removed:
+        phone = phone or rows[cid][2]
+        email = email or rows[cid][3]
+
+    log_changes(cursor, txn, "update", [keep_id])
+    log_changes(cursor, txn, "delete", removed)
     cursor.execute(
-        "UPDATE contacts SET name = ?, phone = ?, email = ? WHERE id = ?",
-        (name, phone, email, contact_id)
+        "UPDATE contacts SET phone = ?, email = ?, phone_norm = ?, email_norm = ? WHERE id = ?",
+        (phone, email, normalize_phone(phone), normalize_email(email), keep_id)
     )
-    conn.commit()
+    for cid in removed:
+        cursor.execute("DELETE FROM contacts WHERE id = ?", (cid,))
+        _unindex_contact_name(cursor, cid)
+    return (keep_id, name, phone, email), removed
 
-def delete_contact_db(conn, contact_id):
-    """Deletes a contact from the database."""
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM contacts WHERE id = ?", (contact_id,))
-    conn.commit()
+def merge_contacts_db(conn, groups):
+    """Merges each (keep_id, duplicate_ids) group in a single transaction.
+
+    Returns [(merged_row, removed_ids), ...] for the groups whose keep_id still exists.
+    """
+    results = []
+    with writing(conn) as conn:
+        cursor = conn.cursor()
+        txn = begin_txn(cursor, "merge")
+        for keep_id, duplicate_ids in groups:
+            merged, removed = _merge_group(cursor, txn, keep_id, duplicate_ids)
+            if merged is not None:
+                results.append((merged, removed))
+        conn.commit()
+    return results
+
+def _select_rows(cursor, contact_ids):
+    rows = []
+    for start in range(0, len(contact_ids), CHUNK_SIZE):
+        chunk = contact_ids[start:start + CHUNK_SIZE]
+        cursor.execute(
+            f"SELECT id, name, phone, email FROM contacts WHERE id IN ({','.join('?' * len(chunk))})", chunk
+        )
+        rows.extend(cursor.fetchall())
+    return rows
+
+def update_contacts_db(conn, contact_ids, phone=None, email=None):
+    """Sets phone and/or email on many contacts in one transaction; None leaves a field unchanged.
+
+    Returns (txn, updated_rows), where txn identifies the edit for undo_txn_db.
+    """
+    contact_ids = list(contact_ids)
+    with writing(conn) as conn:
+        cursor = conn.cursor()
+        txn = begin_txn(cursor, "bulk edit")
+        log_changes(cursor, txn, "update", contact_ids)
+        cursor.executemany(
+            "UPDATE contacts SET phone = COALESCE(?, phone), email = COALESCE(?, email), "
+            "phone_norm = COALESCE(?, phone_norm), email_norm = COALESCE(?, email_norm) WHERE id = ?",
+            ((phone, email,
+              normalize_phone(phone) if phone is not None else None,
+              normalize_email(email) if email is not None else None,
+              contact_id) for contact_id in contact_ids)
+        )
+        rows = _select_rows(cursor, contact_ids)
+        conn.commit()
+    return txn, rows
+
+def delete_contacts_db(conn, contact_ids):
+    """Deletes many contacts in one transaction and returns (txn, ids that existed)."""
+    contact_ids = list(contact_ids)
+    with writing(conn) as conn:
+        cursor = conn.cursor()
+        existing = [row[0] for row in _select_rows(cursor, contact_ids)]
+        txn = begin_txn(cursor, "bulk delete")
+        log_changes(cursor, txn, "delete", existing)
+        for start in range(0, len(existing), CHUNK_SIZE):
+            chunk = existing[start:start + CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"DELETE FROM contacts WHERE id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM contact_trigrams WHERE contact_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM contact_phonetics WHERE contact_id IN ({placeholders})", chunk)
+        conn.commit()
+    return txn, existing
+
+def undo_txn_db(conn, txn):
+    """Reverts transaction txn, as returned by the write that made it.
+
+    The undo is itself logged (label 'undo'). Returns (label, changed_rows,
+    deleted_ids), or None if txn is unknown, pruned or already undone. Raises
+    UndoConflict if a later transaction that is still in effect touched any of
+    the same contacts, since restoring the before-images would silently throw
+    that work away. Later undos are not counted: they only put rows back.
+    """
+    with writing(conn) as conn:
+        cursor = conn.cursor()
+        found = cursor.execute(
+            "SELECT label FROM contact_txns WHERE txn = ? AND undone = 0 AND label != 'undo'", (txn,)
+        ).fetchone()
+        if found is None:
+            return None
+        label = found[0]
+        cursor.execute(
+            "SELECT 1 FROM contact_log l JOIN contact_txns t ON t.txn = l.txn "
+            "WHERE l.txn > ? AND t.undone = 0 AND t.label != 'undo' "
+            "AND l.contact_id IN (SELECT contact_id FROM contact_log WHERE txn = ?) LIMIT 1",
+            (txn, txn)
+        )
+        if cursor.fetchone() is not None:
+            raise UndoConflict(f"The contacts changed by this {label} have been changed again since")
+        entries = cursor.execute(
+            "SELECT op, contact_id, name, phone, email FROM contact_log WHERE txn = ? ORDER BY seq DESC", (txn,)
+        ).fetchall()
+
+        undo_txn = begin_txn(cursor, "undo")
+        restored, deleted = {}, set()
+        for op, contact_id, name, phone, email in entries:
+            if op == "insert":
+                log_changes(cursor, undo_txn, "delete", [contact_id])
+                cursor.execute("DELETE FROM contacts WHERE id = ?", (contact_id,))
+                _unindex_contact_name(cursor, contact_id)
+                deleted.add(contact_id)
+                restored.pop(contact_id, None)
+                continue
+            if op == "update":
+                log_changes(cursor, undo_txn, "update", [contact_id])
+            else:
+                log_changes(cursor, undo_txn, "insert", [contact_id])
+            # Delete and re-insert rather than INSERT OR REPLACE, whose implicit delete skips the delete triggers
+            cursor.execute("DELETE FROM contacts WHERE id = ?", (contact_id,))
+            cursor.execute(
+                "INSERT INTO contacts (id, name, phone, email, phone_norm, email_norm) VALUES (?, ?, ?, ?, ?, ?)",
+                (contact_id, name, phone, email, normalize_phone(phone), normalize_email(email))
+            )
+            _unindex_contact_name(cursor, contact_id)
+            index_contact_names(cursor, [(contact_id, name)])
+            restored[contact_id] = (contact_id, name, phone, email)
+            deleted.discard(contact_id)
+
+        cursor.execute("UPDATE contact_txns SET undone = 1 WHERE txn = ?", (txn,))
+        conn.commit()
+    return label, list(restored.values()), list(deleted)
@@ -0,0 +1,117 @@
+# db_pool.py
+"""Tuned SQLite connections: a single locked writer plus a pool of readers.
+
+With WAL journaling readers never block on the writer (or each other), so
+queries can safely run from worker threads while the UI thread writes.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+READER_POOL_SIZE = 4
+STATEMENT_CACHE_SIZE = 256
+ACQUIRE_TIMEOUT = 10.0  # seconds
+
+# Applied to every connection. journal_mode is persistent and set once by the writer.
+DEFAULT_PRAGMAS = {
+    "synchronous": "NORMAL",     # durable at checkpoints; safe with WAL
+    "cache_size": -32000,        # negative = KiB, so ~32 MB page cache per connection
+    "mmap_size": 268435456,      # 256 MB memory-mapped I/O
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # ms to wait on a locked database
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no reader connection frees up within the acquire timeout."""
+    pass
+
+
+class ConnectionPool:
+    """One writer connection guarded by a lock, plus a fixed pool of read-only connections."""
+
+    def __init__(self, path, readers=READER_POOL_SIZE, pragmas=None, acquire_timeout=ACQUIRE_TIMEOUT):
+        if path == ":memory:":
+            raise ValueError("ConnectionPool needs a database file; in-memory databases are per-connection")
+        self.path = path
+        self.acquire_timeout = acquire_timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+
+        self._readers = queue.LifoQueue()
+        for _ in range(readers):
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            self._readers.put(conn)
+        self._reader_count = readers
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """Yields the writer connection, holding the write lock for the duration.
+
+        An open transaction is rolled back if the block raises.
+        """
+        with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """Borrows a read-only connection from the pool."""
+        try:
+            conn = self._readers.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No reader connection available after {self.acquire_timeout}s")
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def close(self):
+        """Closes the writer and every idle reader."""
+        with self._write_lock:
+            self._writer.close()
+        for _ in range(self._reader_count):
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+@contextmanager
+def writing(conn):
+    """Yields a connection to write with: the pool's writer, or conn itself for a plain sqlite3 connection."""
+    if isinstance(conn, ConnectionPool):
+        with conn.writer() as writer:
+            yield writer
+    else:
+        yield conn
+
+
+@contextmanager
+def reading(conn):
+    """Yields a connection to read with: a pooled reader, or conn itself for a plain sqlite3 connection."""
+    if isinstance(conn, ConnectionPool):
+        with conn.reader() as reader:
+            yield reader
+    else:
+        yield conn
@@ -0,0 +1,78 @@
+# dedupe.py
+"""Bulk duplicate detection over the normalized phone/email columns."""
+
+import hashlib
+
+from db_pool import reading
+from normalize import normalize_name
+
+SCAN_FETCH_SIZE = 10000
+MATCH_FIELDS = ("phone", "email")
+
+
+def _key_hash(field, value):
+    # 8-byte digests keep the key table compact even for millions of rows
+    return int.from_bytes(hashlib.blake2b(f"{field}\0{value}".encode(), digest_size=8).digest(), "big")
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def find_duplicate_groups(conn, match_on=MATCH_FIELDS):
+    """Groups contacts that share a normalized phone, email (or name, if asked).
+
+    Rows are streamed once; each key is hashed and mapped to the first contact
+    that had it, and contacts sharing any key are joined with union-find.
+    Returns lists of (id, name, phone, email) rows, each sorted by id, largest
+    groups first.
+    """
+    first_with_key = {}
+    parent = {}
+
+    with reading(conn) as reader:
+        cursor = reader.cursor()
+        cursor.execute("SELECT id, name, phone_norm, email_norm FROM contacts")
+        while True:
+            rows = cursor.fetchmany(SCAN_FETCH_SIZE)
+            if not rows:
+                break
+            for contact_id, name, phone_norm, email_norm in rows:
+                values = {"phone": phone_norm, "email": email_norm, "name": normalize_name(name) or None}
+                for field in match_on:
+                    if values[field] is None:
+                        continue
+                    key = _key_hash(field, values[field])
+                    other = first_with_key.setdefault(key, contact_id)
+                    if other != contact_id:
+                        parent.setdefault(contact_id, contact_id)
+                        parent.setdefault(other, other)
+                        a, b = _find(parent, contact_id), _find(parent, other)
+                        if a != b:
+                            parent[max(a, b)] = min(a, b)
+
+    members = {}
+    for contact_id in parent:
+        members.setdefault(_find(parent, contact_id), []).append(contact_id)
+    if not members:
+        return []
+
+    rows_by_id = {}
+    ids = list(parent)
+    with reading(conn) as reader:
+        cursor = reader.cursor()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(
+                f"SELECT id, name, phone, email FROM contacts WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            rows_by_id.update((row[0], row) for row in cursor.fetchall())
+
+    groups = [[rows_by_id[cid] for cid in sorted(group) if cid in rows_by_id] for group in members.values()]
+    groups = [group for group in groups if len(group) > 1]
+    groups.sort(key=lambda group: (-len(group), group[0][0]))
+    return groups
@@ -0,0 +1,63 @@
+# fuzzy.py
+"""Name keys for typo-tolerant search: trigrams and Soundex codes."""
+
+import re
+
+_WORD = re.compile(r"[^\W_]+")
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+def words(name):
+    """Lowercased alphanumeric words of a name."""
+    return _WORD.findall(name.lower())
+
+
+def trigrams(name):
+    """Set of character trigrams of each word, padded like pg_trgm ("  jo", " joh", ..., "hn ")."""
+    grams = set()
+    for word in words(name):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def soundex(word):
+    """American Soundex code of a single word, e.g. "robert" -> "R163"."""
+    word = word.lower()
+    if not word:
+        return ""
+    first = word[0]
+    code = first.upper()
+    last = _SOUNDEX_CODES.get(first, "")
+    for letter in word[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if letter not in "hw":
+            last = digit
+    return code.ljust(4, "0")
+
+
+def phonetic_keys(name):
+    """Set of Soundex codes, one per word of the name."""
+    return {soundex(word) for word in words(name) if word[0].isalpha()}
+
+
+def similarity(query_grams, query_keys, name):
+    """Score in [0, 1+] of how well name matches a query.
+
+    Trigram Jaccard similarity, plus a bonus when any word sounds alike.
+    """
+    grams = trigrams(name)
+    union = len(query_grams | grams)
+    score = len(query_grams & grams) / union if union else 0.0
+    if query_keys & phonetic_keys(name):
+        score += 0.3
+    return score
@@ -0,0 +1,267 @@
+# import_export.py
+"""Bulk CSV/vCard import and streaming export for the contacts table."""
+
+import csv
+import os
+
+from database import begin_txn, index_contact_names, log_changes
+from db_pool import reading, writing
+from normalize import normalize_email, normalize_phone
+
+IMPORT_BATCH_SIZE = 5000
+EXPORT_FETCH_SIZE = 5000
+MAX_REJECTED_KEPT = 1000
+CSV_FIELDS = ("name", "phone", "email")
+
+INSERT_SQL = "INSERT INTO contacts (name, phone, email, phone_norm, email_norm) VALUES (?, ?, ?, ?, ?)"
+
+
+class ImportReport:
+    """Summary of a bulk import."""
+
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.rejected = 0
+        # (line number, reason) for the first MAX_REJECTED_KEPT bad rows
+        self.errors = []
+
+    def reject(self, line_no, reason):
+        self.rejected += 1
+        if len(self.errors) < MAX_REJECTED_KEPT:
+            self.errors.append((line_no, reason))
+
+    def __repr__(self):
+        return (f"ImportReport(processed={self.processed}, "
+                f"imported={self.imported}, rejected={self.rejected})")
+
+
+def validate_contact(name, phone, email):
+    """Returns a cleaned (name, phone, email) tuple, or raises ValueError with the reason."""
+    name = (name or "").strip()
+    phone = (phone or "").strip()
+    email = (email or "").strip()
+    if not name:
+        raise ValueError("Name cannot be empty")
+    if email and "@" not in email:
+        raise ValueError(f"Invalid email '{email}'")
+    return (name, phone, email)
+
+
+# ---------------------------------------------------------------------------
+# Readers: yield (line_no, name, phone, email) without loading the whole file
+# ---------------------------------------------------------------------------
+
+def iter_csv_rows(file_obj):
+    """Yields (line_no, name, phone, email) from a CSV file.
+
+    A header row naming the columns is honoured in any order; without one the
+    columns are read as name, phone, email.
+    """
+    reader = csv.reader(file_obj)
+    columns = None
+    for row in reader:
+        line_no = reader.line_num
+        if columns is None:
+            columns = (0, 1, 2)
+            header = [cell.strip().lower() for cell in row]
+            if "name" in header:
+                columns = tuple(header.index(f) if f in header else None for f in CSV_FIELDS)
+                continue
+        if not any(cell.strip() for cell in row):
+            continue
+        yield (line_no, *(row[i] if i is not None and i < len(row) else "" for i in columns))
+
+
+def _unescape_vcard(value):
+    return (value.replace("\\n", "\n").replace("\\N", "\n")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+
+def _iter_unfolded_lines(file_obj):
+    """Joins RFC 6350 folded lines, yielding (line_no, line)."""
+    pending, pending_no = None, 0
+    for line_no, raw in enumerate(file_obj, start=1):
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_no, pending
+        pending, pending_no = line, line_no
+    if pending is not None:
+        yield pending_no, pending
+
+
+def iter_vcard_rows(file_obj):
+    """Yields (line_no, name, phone, email) for each BEGIN:VCARD..END:VCARD block."""
+    card = None
+    for line_no, line in _iter_unfolded_lines(file_obj):
+        if ":" not in line:
+            continue
+        prop, value = line.split(":", 1)
+        key = prop.split(";", 1)[0].split(".")[-1].upper()
+        if key == "BEGIN" and value.strip().upper() == "VCARD":
+            card = {"line": line_no}
+        elif card is None:
+            continue
+        elif key == "END":
+            name = card.get("FN")
+            if not name and card.get("N"):
+                # N is "Family;Given;Additional;Prefix;Suffix"
+                parts = [p for p in card["N"].split(";") if p]
+                name = " ".join(reversed(parts[:2]))
+            yield (card["line"], name, card.get("TEL"), card.get("EMAIL"))
+            card = None
+        elif key in ("FN", "N", "TEL", "EMAIL") and key not in card:
+            card[key] = _unescape_vcard(value.strip())
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def import_rows(conn, rows, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Validates and inserts rows in batched transactions using executemany.
+
+    rows yields (line_no, name, phone, email). progress, if given, is called
+    with the running ImportReport after every committed batch.
+    """
+    report = ImportReport()
+    batch = []
+    txn = None
+
+    def flush():
+        nonlocal txn
+        # Take the writer per batch so interactive writes can interleave
+        with writing(conn) as writer, writer:
+            cursor = writer.cursor()
+            if txn is None:
+                # One logged transaction covers the whole import, so it can be undone as a unit
+                txn = begin_txn(cursor, "import")
+            last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM contacts").fetchone()[0]
+            cursor.executemany(INSERT_SQL, (
+                (name, phone, email, normalize_phone(phone), normalize_email(email))
+                for name, phone, email in batch
+            ))
+            # Ids are AUTOINCREMENT, so this batch is exactly the rows above last_id
+            cursor.execute("SELECT id, name FROM contacts WHERE id > ?", (last_id,))
+            inserted = cursor.fetchall()
+            index_contact_names(cursor, inserted)
+            log_changes(cursor, txn, "insert", [contact_id for contact_id, _ in inserted])
+        report.imported += len(batch)
+        batch.clear()
+        if progress:
+            progress(report)
+
+    for line_no, name, phone, email in rows:
+        report.processed += 1
+        try:
+            batch.append(validate_contact(name, phone, email))
+        except ValueError as e:
+            report.reject(line_no, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    elif progress:
+        progress(report)
+    return report
+
+
+def import_file(conn, path, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Imports a .csv or .vcf/.vcard file, picking the reader by extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".vcf", ".vcard"):
+        reader = iter_vcard_rows
+    elif ext == ".csv":
+        reader = iter_csv_rows
+    else:
+        raise ValueError(f"Unsupported import format '{ext}'")
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return import_rows(conn, reader(f), batch_size, progress)
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def iter_contacts(conn, fetch_size=EXPORT_FETCH_SIZE):
+    """Yields (name, phone, email) in rowid order, fetching fetch_size rows at a time.
+
+    Rowid order avoids a sort, so SQLite streams straight off the table.
+    """
+    with reading(conn) as reader:
+        cursor = reader.cursor()
+        cursor.execute("SELECT name, phone, email FROM contacts ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+
+
+def _escape_vcard(value):
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace(",", "\\,").replace(";", "\\;"))
+
+
+def export_csv(conn, path):
+    """Streams every contact to a CSV file and returns the number written."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for row in iter_contacts(conn):
+            writer.writerow(["" if v is None else v for v in row])
+            count += 1
+    return count
+
+
+def export_vcard(conn, path):
+    """Streams every contact to a vCard 3.0 file and returns the number written."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for name, phone, email in iter_contacts(conn):
+            lines = ["BEGIN:VCARD", "VERSION:3.0", f"FN:{_escape_vcard(name)}", f"N:;{_escape_vcard(name)};;;"]
+            if phone:
+                lines.append(f"TEL:{_escape_vcard(phone)}")
+            if email:
+                lines.append(f"EMAIL:{_escape_vcard(email)}")
+            lines.append("END:VCARD")
+            f.write("\r\n".join(lines) + "\r\n")
+            count += 1
+    return count
+
+
+def export_file(conn, path):
+    """Exports to CSV or vCard depending on the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".vcf", ".vcard"):
+        return export_vcard(conn, path)
+    if ext == ".csv":
+        return export_csv(conn, path)
+    raise ValueError(f"Unsupported export format '{ext}'")
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import init_db
+
+    parser = argparse.ArgumentParser(description="Bulk import/export contacts.")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("path", help="CSV (.csv) or vCard (.vcf) file")
+    args = parser.parse_args()
+
+    conn = init_db()
+    if args.action == "import":
+        result = import_file(conn, args.path,
+                             progress=lambda r: print(f"\r{r.processed} rows read, {r.imported} imported, {r.rejected} rejected", end=""))
+        print()
+        for line_no, reason in result.errors[:20]:
+            print(f"  line {line_no}: {reason}")
+    else:
+        print(f"Exported {export_file(conn, args.path)} contacts to {args.path}")
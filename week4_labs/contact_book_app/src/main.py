@@ -1,17 +1,30 @@
 # main.py
 import flet as ft
-from database import init_db
-from app_logic import display_contacts, add_contact, search_contacts
+from backup import SnapshotScheduler
+from database import DB_PATH, init_db
+from async_db import AsyncContactDB
+from app_logic import (display_contacts, add_contact, search_contacts, import_contacts, export_contacts,
+                       show_duplicates_dialog, build_selection_bar, build_alphabet_bar, handle_list_scroll,
+                       watch_changes, backup_contacts, refresh_alphabet_bar)
 
-def main(page: ft.Page):
+async def main(page: ft.Page):
     page.title = "Contact Book"
     page.vertical_alignment = ft.MainAxisAlignment.START
     page.window_width = 450
     page.window_height = 700
     page.theme_mode = ft.ThemeMode.LIGHT
     
-    # Initialize database
-    db_conn = init_db()
+    # Initialize database; queries run on background DB threads
+    db = AsyncContactDB(init_db())
+    # The change-feed task; started once the first page is on screen
+    watcher = None
+    
+    def on_close(e):
+        if watcher is not None:
+            watcher.cancel()
+        db.close()
+    
+    page.on_close = on_close
     
     # Input fields
     name_input = ft.TextField(label="Name", width=380)
@@ -20,15 +33,67 @@ def main(page: ft.Page):
     inputs = (name_input, phone_input, email_input)
     
     # Search field
+    async def on_search_change(e):
+        await search_contacts(page, search_input.value, contacts_list_view, db)
+    
     search_input = ft.TextField(
         label="Search contacts...",
         width=380,
         prefix_icon=ft.Icons.SEARCH,
-        on_change=lambda e: search_contacts(page, search_input.value, contacts_list_view, db_conn)
+        on_change=on_search_change
     )
     
-    # Contacts list
-    contacts_list_view = ft.ListView(expand=1, spacing=10, auto_scroll=True)
+    # Contacts list; pages load as it scrolls, so it must not auto-scroll to the end
+    async def on_list_scroll(e: ft.OnScrollEvent):
+        await handle_list_scroll(page, e, contacts_list_view, db)
+    
+    contacts_list_view = ft.ListView(expand=1, spacing=10, on_scroll=on_list_scroll, on_scroll_interval=100)
+    
+    # Bulk import/export
+    import_status = ft.Text("", size=12, italic=True)
+    
+    async def on_import_result(e: ft.FilePickerResultEvent):
+        if e.files:
+            await import_contacts(page, e.files[0].path, contacts_list_view, db, import_status)
+    
+    async def on_export_result(e: ft.FilePickerResultEvent):
+        if e.path:
+            await export_contacts(page, e.path, db)
+    
+    async def on_backup_result(e: ft.FilePickerResultEvent):
+        if e.path:
+            await backup_contacts(page, e.path, db, import_status)
+    
+    import_picker = ft.FilePicker(on_result=on_import_result)
+    export_picker = ft.FilePicker(on_result=on_export_result)
+    backup_picker = ft.FilePicker(on_result=on_backup_result)
+    page.overlay.extend([import_picker, export_picker, backup_picker])
+    
+    import_button = ft.TextButton(
+        text="Import",
+        icon=ft.Icons.UPLOAD_FILE,
+        on_click=lambda e: import_picker.pick_files(allowed_extensions=["csv", "vcf"])
+    )
+    export_button = ft.TextButton(
+        text="Export",
+        icon=ft.Icons.DOWNLOAD,
+        on_click=lambda e: export_picker.save_file(file_name="contacts.csv", allowed_extensions=["csv", "vcf"])
+    )
+    
+    backup_button = ft.IconButton(
+        icon=ft.Icons.BACKUP,
+        tooltip="Back up database",
+        on_click=lambda e: backup_picker.save_file(file_name="contacts-backup.db", allowed_extensions=["db"])
+    )
+    
+    async def on_duplicates_click(e):
+        await show_duplicates_dialog(page, contacts_list_view, db)
+    
+    duplicates_button = ft.IconButton(
+        icon=ft.Icons.MERGE_TYPE,
+        tooltip="Find duplicates",
+        on_click=on_duplicates_click
+    )
     
     # Theme toggle
     def toggle_theme(e):
@@ -41,10 +106,13 @@ def main(page: ft.Page):
     )
     
     # Add button
+    async def on_add_click(e):
+        await add_contact(page, inputs, contacts_list_view, db)
+    
     add_button = ft.ElevatedButton(
         text="Add Contact",
         icon=ft.Icons.ADD,
-        on_click=lambda e: add_contact(page, inputs, contacts_list_view, db_conn)
+        on_click=on_add_click
     )
     
     # Layout
@@ -61,14 +129,27 @@ def main(page: ft.Page):
             email_input,
             add_button,
             ft.Divider(),
-            ft.Text("Contacts:", size=18, weight=ft.FontWeight.BOLD),
+            ft.Row([
+                ft.Text("Contacts:", size=18, weight=ft.FontWeight.BOLD),
+                ft.Row([import_button, export_button, backup_button, duplicates_button], spacing=0)
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            import_status,
             search_input,
-            contacts_list_view,
+            build_selection_bar(page, contacts_list_view, db),
+            ft.Row([
+                contacts_list_view,
+                build_alphabet_bar(page, contacts_list_view, db)
+            ], vertical_alignment=ft.CrossAxisAlignment.START, expand=1),
         ])
     )
     
-    # Load initial contacts
-    display_contacts(page, contacts_list_view, db_conn)
+    # Load initial contacts, then follow changes made by other sessions
+    await refresh_alphabet_bar(contacts_list_view, db)
+    await display_contacts(page, contacts_list_view, db)
+    watcher = page.run_task(watch_changes, page, contacts_list_view, db)
 
 if __name__ == "__main__":
+    # One scheduler per process, shared by every session
+    snapshots = SnapshotScheduler(DB_PATH)
+    snapshots.start()
     ft.app(target=main)
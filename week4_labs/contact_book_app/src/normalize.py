@@ -0,0 +1,44 @@
+# normalize.py
+"""Canonical forms of phone numbers, emails and names for exact matching."""
+
+import re
+
+# Country calling code assumed for numbers written in local form ("0917...")
+DEFAULT_COUNTRY_CODE = "63"
+
+_NON_DIGITS = re.compile(r"\D")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_phone(phone, country_code=DEFAULT_COUNTRY_CODE):
+    """E.164-style "+<country><number>" digits, or None if there are no digits.
+
+    "0917 123 4567" -> "+639171234567", "+1 (555) 010-9999" -> "+15550109999".
+    """
+    if not phone:
+        return None
+    digits = _NON_DIGITS.sub("", phone)
+    if not digits:
+        return None
+    if phone.lstrip().startswith("+"):
+        return "+" + digits
+    if digits.startswith("00"):
+        return "+" + digits[2:]
+    if digits.startswith("0"):
+        return "+" + country_code + digits[1:]
+    if len(digits) <= 10:
+        return "+" + country_code + digits
+    return "+" + digits
+
+
+def normalize_email(email):
+    """Trimmed, lowercased email, or None if empty."""
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email or None
+
+
+def normalize_name(name):
+    """Casefolded name with runs of whitespace collapsed."""
+    return _SPACES.sub(" ", (name or "").strip()).casefold()
@@ -0,0 +1,348 @@
+# repository.py
+"""In-memory sorted contact index kept in step with the database.
+
+The index is loaded once, then every add/update/delete writes through to
+SQLite and patches the index in place, so list renders and searches are
+served from memory.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from database import (FUZZY_LIMIT, add_contact_db, delete_contact_db, delete_contacts_db, get_all_contacts_db,
+                      get_change_version_db, get_changes_since_db, get_initial_counts_db, merge_contacts_db,
+                      undo_txn_db, update_contact_db, update_contacts_db)
+
+# Sorts after any character that can appear in a name
+_MAX_CHAR = "\U0010ffff"
+# Change sets larger than this (or a tenth of the index) reload instead of patching
+REBUILD_THRESHOLD = 1000
+# Rows per window handed to lazily loaded lists
+PAGE_SIZE = 200
+
+
+def sort_key(name, contact_id):
+    """The order contacts are listed in: name ignoring case, then id."""
+    return (name.lower(), contact_id)
+
+
+class Contact:
+    """A single contact record."""
+
+    __slots__ = ("id", "name", "phone", "email")
+
+    def __init__(self, contact_id, name, phone, email):
+        self.id = contact_id
+        self.name = name
+        self.phone = phone
+        self.email = email
+
+    def as_row(self):
+        return (self.id, self.name, self.phone, self.email)
+
+
+class SearchCache:
+    """Remembers the last search so a narrower query can filter its results.
+
+    Any name containing "joh" also contains "jo", so when the new term contains
+    the cached one the answer is a subset of the cached matches. The cache is
+    only valid for the index version it was built against.
+    """
+
+    __slots__ = ("term", "version", "matches")
+
+    def __init__(self):
+        self.term = None
+        self.version = -1
+        self.matches = None  # [(lowercased name, row), ...] in name order
+
+    def narrow(self, term, version):
+        """Matches for term filtered from the cached results, or None on a miss."""
+        if self.matches is None or self.version != version or self.term not in term:
+            return None
+        if term == self.term:
+            return self.matches
+        return [match for match in self.matches if term in match[0]]
+
+    def store(self, term, version, matches):
+        self.term = term
+        self.version = version
+        self.matches = matches
+
+
+def _match_position(matches, key):
+    """bisect_left for a sort key over search matches, which are in sort_key order of their rows."""
+    lo, hi = 0, len(matches)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        row = matches[mid][1]
+        if sort_key(row[1], row[0]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class ContactRepository:
+    """Contacts sorted by sort_key, so "bob" and "Bob" list together between "Anna" and "Carl".
+
+    The order lives in two parallel sequences: lowercased names, which are
+    also used for case-insensitive matching, and ids packed in an array.
+    Records are looked up by id in a dict of __slots__ objects.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._folded = []
+        self._ids = array("q")
+        self._by_id = {}
+        # Bumped on every change to the index; invalidates the search cache
+        self._version = 0
+        # Change feed version the index has caught up with; see sync()
+        self._feed_version = 0
+        self._search_cache = SearchCache()
+
+    # -- loading --------------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.reload()
+
+    def reload(self):
+        """Rebuilds the index from the database, e.g. after a bulk import."""
+        with self._lock:
+            # Read first: anything committed during the load is fetched again by the next sync()
+            self._feed_version = get_change_version_db(self.pool)
+            rows = get_all_contacts_db(self.pool)
+            rows.sort(key=lambda row: sort_key(row[1], row[0]))
+            self._folded = [row[1].lower() for row in rows]
+            self._ids = array("q", (row[0] for row in rows))
+            self._by_id = {row[0]: Contact(*row) for row in rows}
+            self._loaded = True
+            self._version += 1
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._ids)
+
+    # -- index maintenance ----------------------------------------------------
+
+    def _position(self, name, contact_id):
+        """Index of (name, contact_id) in the sorted order, or where it would go; name may be folded already."""
+        folded = name.lower()
+        lo = bisect_left(self._folded, folded)
+        hi = bisect_right(self._folded, folded, lo)
+        while lo < hi and self._ids[lo] < contact_id:
+            lo += 1
+        return lo
+
+    def _insert(self, contact):
+        if contact.id in self._by_id:
+            # Already picked up by a reload that raced with this write
+            return
+        index = self._position(contact.name, contact.id)
+        self._folded.insert(index, contact.name.lower())
+        self._ids.insert(index, contact.id)
+        self._by_id[contact.id] = contact
+        self._version += 1
+
+    def _remove(self, contact):
+        index = self._position(contact.name, contact.id)
+        del self._folded[index]
+        del self._ids[index]
+        del self._by_id[contact.id]
+        self._version += 1
+
+    def apply_changes(self, changed_rows, deleted_ids):
+        """Patches the index with rows changed and ids deleted elsewhere."""
+        with self._lock:
+            if not self._loaded:
+                return
+            if len(changed_rows) + len(deleted_ids) > max(REBUILD_THRESHOLD, len(self._ids) // 10):
+                # Each patch shifts the parallel sequences; past this size a rebuild is cheaper
+                self.reload()
+                return
+            for contact_id in deleted_ids:
+                old = self._by_id.get(contact_id)
+                if old is not None:
+                    self._remove(old)
+            for row in changed_rows:
+                old = self._by_id.get(row[0])
+                if old is not None:
+                    self._remove(old)
+                self._insert(Contact(*row))
+
+    def sync(self):
+        """Applies contacts written by other sessions since the last sync or reload.
+
+        Returns None if nothing changed, otherwise (changed_rows, deleted_ids,
+        reloaded); reloaded is True when the change log had been pruned past
+        this index and it was rebuilt from scratch. Writes made through this
+        repository are reported again, which is harmless as rows are current.
+        """
+        with self._lock:
+            if not self._loaded:
+                return None
+            changes = get_changes_since_db(self.pool, self._feed_version)
+            if changes is None:
+                self.reload()
+                return [], [], True
+            version, changed_rows, deleted_ids = changes
+            self._feed_version = version
+            if not changed_rows and not deleted_ids:
+                return None
+            self.apply_changes(changed_rows, deleted_ids)
+            return changed_rows, deleted_ids, False
+
+    # -- write-through ---------------------------------------------------------
+
+    def add(self, name, phone, email):
+        """Inserts a contact and returns its row."""
+        row = add_contact_db(self.pool, name, phone, email)
+        with self._lock:
+            if self._loaded:
+                self._insert(Contact(*row))
+        return row
+
+    def update(self, contact_id, name, phone, email):
+        """Updates a contact and returns its row, or None if it no longer exists."""
+        row = update_contact_db(self.pool, contact_id, name, phone, email)
+        with self._lock:
+            if self._loaded:
+                old = self._by_id.get(contact_id)
+                if old is not None:
+                    self._remove(old)
+                if row is not None:
+                    self._insert(Contact(*row))
+        return row
+
+    def delete(self, contact_id):
+        """Deletes a contact and returns the txn id of the delete, or None if nothing was deleted."""
+        txn = delete_contact_db(self.pool, contact_id)
+        with self._lock:
+            if self._loaded:
+                old = self._by_id.get(contact_id)
+                if old is not None:
+                    self._remove(old)
+        return txn
+
+    def merge(self, groups):
+        """Merges (keep_id, duplicate_ids) groups in one transaction; see merge_contacts_db."""
+        results = merge_contacts_db(self.pool, groups)
+        self.apply_changes([merged for merged, _ in results], [cid for _, removed in results for cid in removed])
+        return results
+
+    def update_many(self, contact_ids, phone=None, email=None):
+        """Bulk phone/email edit in one transaction; returns (txn, updated_rows)."""
+        txn, rows = update_contacts_db(self.pool, contact_ids, phone, email)
+        self.apply_changes(rows, [])
+        return txn, rows
+
+    def delete_many(self, contact_ids):
+        """Bulk delete in one transaction; returns (txn, ids that were deleted)."""
+        txn, deleted = delete_contacts_db(self.pool, contact_ids)
+        self.apply_changes([], deleted)
+        return txn, deleted
+
+    def undo(self, txn):
+        """Reverts logged transaction txn; see undo_txn_db."""
+        result = undo_txn_db(self.pool, txn)
+        if result is not None:
+            _, changed_rows, deleted_ids = result
+            self.apply_changes(changed_rows, deleted_ids)
+        return result
+
+    # -- lookups ----------------------------------------------------------------
+
+    def get(self, contact_id):
+        with self._lock:
+            self._ensure_loaded()
+            contact = self._by_id.get(contact_id)
+            return contact.as_row() if contact else None
+
+    def _rows(self, start, stop):
+        by_id = self._by_id
+        return [by_id[contact_id].as_row() for contact_id in self._ids[start:stop]]
+
+    def all(self):
+        """All contacts as (id, name, phone, email) rows in name order."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._rows(0, len(self._ids))
+
+    def range(self, low, high=None):
+        """Contacts with low <= name < high ignoring case (high=None means no upper bound)."""
+        with self._lock:
+            self._ensure_loaded()
+            start = bisect_left(self._folded, low.lower())
+            stop = len(self._folded) if high is None else bisect_left(self._folded, high.lower(), start)
+            return self._rows(start, stop)
+
+    def prefix(self, prefix):
+        """Contacts whose name starts with prefix, ignoring case like the sort order."""
+        return self.range(prefix, prefix + _MAX_CHAR)
+
+    def _matches(self, term):
+        """[(lowercased name, row), ...] for names containing term, via the search cache."""
+        matches = self._search_cache.narrow(term, self._version)
+        if matches is None:
+            ids, by_id = self._ids, self._by_id
+            matches = [(name, by_id[ids[i]].as_row()) for i, name in enumerate(self._folded) if term in name]
+        self._search_cache.store(term, self._version, matches)
+        return matches
+
+    def search(self, search_term=None):
+        """Case-insensitive substring match on name, like get_all_contacts_db.
+
+        A term that extends the previous one is answered by filtering the
+        previous results; otherwise the whole index is scanned.
+        """
+        if not search_term:
+            return self.all()
+        with self._lock:
+            self._ensure_loaded()
+            return [row for _, row in self._matches(search_term.lower())]
+
+    def page(self, search_term=None, after=None, before=None, limit=PAGE_SIZE):
+        """A window of up to limit contacts in name order, optionally filtered like search().
+
+        after and before are exclusive sort_key keys: the window starts just
+        after after, or ends just before before, and otherwise starts at the top.
+        (initial, -1) as after seeks to the first name at or past initial, in either case.
+        Returns (rows, more_before, more_after).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if search_term:
+                matches = self._matches(search_term.lower())
+                total = len(matches)
+                position = lambda key: _match_position(matches, key)
+                rows = lambda start, stop: [row for _, row in matches[start:stop]]
+            else:
+                total = len(self._ids)
+                position = lambda key: self._position(*key)
+                rows = self._rows
+
+            if before is not None:
+                stop = position(before)
+                start = max(0, stop - limit)
+            else:
+                start = 0
+                if after is not None:
+                    start = position(after)
+                    if start < total and rows(start, start + 1)[0][0] == after[1]:
+                        start += 1
+                stop = min(total, start + limit)
+            return rows(start, stop), start > 0, stop < total
+
+    def initial_counts(self):
+        """[(initial, count), ...] from the trigger-maintained table; see get_initial_counts_db."""
+        return get_initial_counts_db(self.pool)
+
+    def fuzzy_search(self, search_term, limit=FUZZY_LIMIT):
+        """Top matches by trigram similarity and sound, served by the on-disk name index."""
+        return get_all_contacts_db(self.pool, search_term, fuzzy=True, limit=limit)